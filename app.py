@@ -1,8 +1,20 @@
 import os
+import io
+import csv
 import json
+import shutil
 import sqlite3
 import tempfile
-from flask import Flask, render_template, request, send_file, jsonify
+import threading
+import time
+import zipfile
+from flask import Flask, g, has_app_context, render_template, request, send_file, jsonify
+from tools.assets import (asset_path, put_asset, asset_url, set_asset_dir,
+                          sniff_mime, store_bg_images, store_data_uri, validate_image)
+from tools.export_cache import ExportCache, export_key
+from tools.export_jobs import ExportJobs, JobRejected
+from tools.migrate import SCHEMA_VERSION, migrate
+from tools.pathpack import dump_path_data, load_path_data
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max upload
@@ -18,15 +30,109 @@ else:
 
 DB_PATH = os.path.join(TMP_DIR, "app.db")
 
+# Keys of a template in GET /api/templates; the last three are heavy
+TEMPLATE_FIELDS = ("id", "customerId", "name", "width", "height", "orientation",
+                   "padding", "sewing", "folding", "printingArea", "source",
+                   "partitions", "components", "bgImage")
+# Computed keys available through summary=1 or fields=
+TEMPLATE_COUNT_FIELDS = ("partitionCount", "componentCount", "hasBgImage")
+TEMPLATE_SUMMARY_FIELDS = TEMPLATE_FIELDS[:-3] + TEMPLATE_COUNT_FIELDS
+TEMPLATE_PAGE_MAX = 500
+
+_TEMPLATE_COLUMNS = (
+    "id", "customer_id", "name", "width", "height", "orientation",
+    "pad_top", "pad_bottom", "pad_left", "pad_right",
+    "sew_position", "sew_distance", "sew_padding", "fold_type", "fold_padding",
+    "print_x", "print_y", "print_w", "print_h", "bg_image", "source")
+
+# Exports larger than this spill from memory to an anonymous temp file
+EXPORT_SPOOL_LIMIT = 4 * 1024 * 1024  # 4MB
+
+# Rows the synchronous /export/batch/<fmt> renders in the request. The
+# whole document is rendered (reportlab writes it on save) before anything
+# is sent, so request time and memory grow with the row count; larger
+# batches get 413 and run as background jobs on /export/jobs/batch/<fmt>
+BATCH_SYNC_MAX_ROWS = 1000
+
+_export_cache = ExportCache(os.path.join(TMP_DIR, "export_cache"))
+
+# Uploaded images, stored once per content hash and served from /assets/<id>
+set_asset_dir(os.path.join(TMP_DIR, "assets"))
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_CSP = "default-src 'none'; sandbox"
+
+# Background export jobs: worker processes, jobs queued or running before
+# submissions get 429, and how long finished results are kept (seconds)
+EXPORT_JOB_WORKERS = 2
+EXPORT_JOB_QUEUE_LIMIT = 8
+EXPORT_JOB_TTL = 3600
+
+_export_jobs = ExportJobs(os.path.join(TMP_DIR, "jobs"), os.path.join(TMP_DIR, "assets"),
+                          workers=EXPORT_JOB_WORKERS, queue_limit=EXPORT_JOB_QUEUE_LIMIT,
+                          ttl=EXPORT_JOB_TTL)
+
+
+# Applied to every new connection. journal_mode=WAL is persistent and is
+# set once at startup, so readers are not blocked by component saves.
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",     # 16MB page cache
+    "PRAGMA mmap_size = 268435456",   # 256MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+)
+SQLITE_CACHED_STATEMENTS = 256
+# Most ids bound into one "IN (...)" list
+SQLITE_MAX_IN_PARAMS = 500
+
+_db_local = threading.local()
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, cached_statements=SQLITE_CACHED_STATEMENTS)
+    conn.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    """
+    Return this thread's database connection.
+
+    Connections are opened once per thread and reused across requests;
+    teardown rolls back anything a request left uncommitted. Callers must
+    not close the connection.
+    """
+    conn = getattr(_db_local, "conn", None)
+    if conn is None or _db_local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _db_local.conn = _connect()
+        _db_local.path = DB_PATH
+    if has_app_context():
+        g.db = conn
     return conn
 
 
-def _template_to_dict(row, partitions, components=None):
+@app.teardown_appcontext
+def _release_db(exc):
+    conn = g.pop("db", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def _component_to_dict(row):
+    """Map a components row to JSON, unpacking stored path geometry."""
+    c = dict(row)
+    c["path_data"] = load_path_data(c["path_data"])
+    if c["type"] == "image":
+        c["dataUri"] = c["content"] or ""
+    return c
+
+
+def _template_to_dict(row, partitions, components=None, include_bg=True):
     return {
         "id": row["id"],
         "customerId": row["customer_id"],
@@ -50,161 +156,154 @@ def _template_to_dict(row, partitions, components=None):
             "w": row["print_w"], "h": row["print_h"]
         },
         "partitions": [dict(p) for p in partitions],
-        "components": [dict(c) for c in (components or [])],
-        "bgImage": row["bg_image"] or "",
+        "components": [_component_to_dict(c) for c in (components or [])],
+        "bgImage": (row["bg_image"] or "") if include_bg else "",
         "source": row["source"] if "source" in row.keys() else "drawing"
     }
 
 
-# Auto-init DB on first run
-if not os.path.exists(DB_PATH):
-    try:
-        from tools.init_db import init_db
-        init_db()
-    except Exception as e:
-        print(f"DB init failed: {e}")
-else:
-    # Migrate: add bg_image column if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _cols = [r[1] for r in _mc.execute("PRAGMA table_info(templates)").fetchall()]
-        if "bg_image" not in _cols:
-            _mc.execute("ALTER TABLE templates ADD COLUMN bg_image TEXT DEFAULT ''")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"Migration failed: {e}")
-    # Migrate: add page column to partitions if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _pcols = [r[1] for r in _mc.execute("PRAGMA table_info(partitions)").fetchall()]
-        if "page" not in _pcols:
-            _mc.execute("ALTER TABLE partitions ADD COLUMN page INTEGER NOT NULL DEFAULT 0")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"Partition migration failed: {e}")
-    # Migrate: add locked column to partitions if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _pcols2 = [r[1] for r in _mc.execute("PRAGMA table_info(partitions)").fetchall()]
-        if "locked" not in _pcols2:
-            _mc.execute("ALTER TABLE partitions ADD COLUMN locked INTEGER NOT NULL DEFAULT 0")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"Locked migration failed: {e}")
-    # Migrate: add source column to templates if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _cols2 = [r[1] for r in _mc.execute("PRAGMA table_info(templates)").fetchall()]
-        if "source" not in _cols2:
-            _mc.execute("ALTER TABLE templates ADD COLUMN source TEXT DEFAULT 'drawing'")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"Source migration failed: {e}")
-    # Migrate: create components table if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _tables = [r[0] for r in _mc.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
-        if "components" not in _tables:
-            _mc.execute("""CREATE TABLE IF NOT EXISTS components (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                template_id INTEGER NOT NULL REFERENCES templates(id) ON DELETE CASCADE,
-                partition_id INTEGER REFERENCES partitions(id) ON DELETE SET NULL,
-                page INTEGER NOT NULL DEFAULT 0,
-                type TEXT NOT NULL CHECK(type IN ('text','paragraph','barcode','qrcode','image')),
-                content TEXT DEFAULT '',
-                x REAL NOT NULL DEFAULT 0,
-                y REAL NOT NULL DEFAULT 0,
-                w REAL NOT NULL DEFAULT 20,
-                h REAL NOT NULL DEFAULT 10,
-                font_family TEXT DEFAULT 'Arial',
-                font_size REAL DEFAULT 8,
-                sort_order INTEGER DEFAULT 0
-            )""")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"Components migration failed: {e}")
-    # Migrate: add path_data column to components if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _ccols = [r[1] for r in _mc.execute("PRAGMA table_info(components)").fetchall()]
-        if "path_data" not in _ccols:
-            _mc.execute("ALTER TABLE components ADD COLUMN path_data TEXT DEFAULT NULL")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"path_data migration failed: {e}")
-    # Migrate: update components type constraint to include pdfpath (requires recreate)
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        # Check if pdfpath is already in the constraint by trying to insert a test row
-        _mc.execute("BEGIN")
-        try:
-            _mc.execute("INSERT INTO components (template_id, type) VALUES (-1, 'pdfpath')")
-            _mc.execute("DELETE FROM components WHERE template_id = -1")
-            _mc.execute("ROLLBACK")
-        except:
-            # Constraint doesn't include pdfpath, need to recreate table
-            _mc.execute("ROLLBACK")
-            _mc.execute("""CREATE TABLE components_new (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                template_id INTEGER NOT NULL REFERENCES templates(id) ON DELETE CASCADE,
-                partition_id INTEGER REFERENCES partitions(id) ON DELETE SET NULL,
-                page INTEGER NOT NULL DEFAULT 0,
-                type TEXT NOT NULL CHECK(type IN ('text','paragraph','barcode','qrcode','image','pdfpath')),
-                content TEXT DEFAULT '',
-                x REAL NOT NULL DEFAULT 0,
-                y REAL NOT NULL DEFAULT 0,
-                w REAL NOT NULL DEFAULT 20,
-                h REAL NOT NULL DEFAULT 10,
-                font_family TEXT DEFAULT 'Arial',
-                font_size REAL DEFAULT 8,
-                sort_order INTEGER DEFAULT 0,
-                path_data TEXT DEFAULT NULL
-            )""")
-            _mc.execute("INSERT INTO components_new SELECT id, template_id, partition_id, page, type, content, x, y, w, h, font_family, font_size, sort_order, path_data FROM components")
-            _mc.execute("DROP TABLE components")
-            _mc.execute("ALTER TABLE components_new RENAME TO components")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"pdfpath type migration failed: {e}")
-    # Migrate: add group_id column to components if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _ccols = [r[1] for r in _mc.execute("PRAGMA table_info(components)").fetchall()]
-        if "group_id" not in _ccols:
-            _mc.execute("ALTER TABLE components ADD COLUMN group_id TEXT DEFAULT NULL")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"group_id migration failed: {e}")
+def _component_to_export(row):
+    """Map a components row to the export payload shape the editor sends."""
+    comp = {
+        "type": row["type"], "content": row["content"] or "",
+        "x": row["x"], "y": row["y"], "width": row["w"], "height": row["h"],
+        "fontFamily": row["font_family"], "fontSize": row["font_size"],
+        "page": row["page"]
+    }
+    if row["type"] == "image":
+        comp["dataUri"] = row["content"] or ""
+    if row["type"] == "pdfpath" and row["path_data"]:
+        comp["pathData"] = load_path_data(row["path_data"])
+        comp["visible"] = bool(row["visible"])
+    return comp
+
+
+def _load_export_data(db, tid, edit=None):
+    """
+    Build an export payload for a saved template, or None if it does not exist.
+
+    edit is an optional component edit in the PATCH body shape, applied to
+    the loaded components without saving it.
+    """
+    row = db.execute("SELECT width, height FROM templates WHERE id=?", (tid,)).fetchone()
+    if row is None:
+        return None
+    comps = db.execute(
+        "SELECT * FROM components WHERE template_id=? ORDER BY page, sort_order",
+        (tid,)
+    ).fetchall()
+    if edit:
+        comps = _apply_component_edit(comps, edit)
+    return {
+        "label": {"width": row["width"], "height": row["height"]},
+        "components": [_component_to_export(c) for c in comps]
+    }
 
-    # Migrate: add visible column to components if missing
-    try:
-        _mc = sqlite3.connect(DB_PATH)
-        _ccols = [r[1] for r in _mc.execute("PRAGMA table_info(components)").fetchall()]
-        if "visible" not in _ccols:
-            _mc.execute("ALTER TABLE components ADD COLUMN visible INTEGER DEFAULT 1")
-            _mc.commit()
-        _mc.close()
-    except Exception as e:
-        print(f"visible migration failed: {e}")
 
-    # Migrate: add locked column to components if missing
+def _apply_component_edit(rows, edit):
+    """
+    Apply insert/update/delete/reorder to component rows in memory, in
+    drawing order. Nothing is stored: images keep their data URIs.
+    """
+    by_id = {r["id"]: dict(r) for r in rows}
+
+    def edited(cid):
+        if cid not in by_id:
+            raise LookupError("Unknown component id")
+        return by_id[cid]
+
+    for c in edit.get("update", []):
+        edited(c["id"]).update(_component_columns(c, _EXPORT_COMPONENT_FIELDS))
+    for c in edit.get("reorder", []):
+        edited(c["id"])["sort_order"] = c["sortOrder"]
+    for cid in edit.get("delete", []):
+        edited(cid)
+        del by_id[cid]
+
+    comps = list(by_id.values())
+    for c in edit.get("insert", []):
+        cols = _component_columns({**_COMPONENT_INSERT_DEFAULTS, **c}, _EXPORT_COMPONENT_FIELDS)
+        for required in ("type", "x", "y", "w", "h"):
+            if required not in cols:
+                raise ValueError(f"Inserted component is missing '{required}'")
+        comps.append(cols)
+    comps.sort(key=lambda c: (c["page"], c["sort_order"]))
+    return comps
+
+
+def _render_plan(db, tid):
+    """
+    Return the render plan (tools/render_plan.py) of a saved template,
+    building it if the cached one is missing or stale; None if the
+    template does not exist.
+    """
+    from tools.render_plan import build_plan, get_plan
+
+    row = db.execute("SELECT revision FROM templates WHERE id=?", (tid,)).fetchone()
+    if row is None:
+        return None
+    plan = get_plan(tid, row["revision"])
+    if plan is None:
+        plan = build_plan(tid, row["revision"], _load_export_data(db, tid))
+    return plan
+
+
+def _rebuild_render_plan(db, tid):
+    """Compile a template's render plan after a save, off the export path."""
     try:
-        _mc = sqlite3.connect(DB_PATH)
-        _ccols = [r[1] for r in _mc.execute("PRAGMA table_info(components)").fetchall()]
-        if "locked" not in _ccols:
-            _mc.execute("ALTER TABLE components ADD COLUMN locked INTEGER DEFAULT 0")
-            _mc.commit()
-        _mc.close()
+        _render_plan(db, tid)
     except Exception as e:
-        print(f"locked migration failed: {e}")
+        print(f"Render plan for template {tid} failed: {e}")
+
+
+def _members_by_parent(db, parent_type):
+    """Load all members of one parent type in a single query, grouped by parent id."""
+    grouped = {}
+    for m in db.execute(
+            "SELECT * FROM members WHERE parent_type=? ORDER BY parent_id, id",
+            (parent_type,)):
+        grouped.setdefault(m["parent_id"], []).append(dict(m))
+    return grouped
+
+
+def _select_in(db, sql, ids):
+    """
+    Run sql with its "{}" replaced by one placeholder per id.
+
+    Ids are bound SQLITE_MAX_IN_PARAMS at a time, so the statement stays
+    under SQLite's variable limit (999 on older builds) however many
+    there are; rows come back chunk by chunk, in the order of ids.
+    """
+    rows = []
+    for i in range(0, len(ids), SQLITE_MAX_IN_PARAMS):
+        chunk = ids[i:i + SQLITE_MAX_IN_PARAMS]
+        rows += db.execute(sql.format(", ".join("?" * len(chunk))), chunk).fetchall()
+    return rows
+
+
+def _group_by_template(rows):
+    """Group partition or component rows by template_id, keeping their order."""
+    grouped = {}
+    for r in rows:
+        grouped.setdefault(r["template_id"], []).append(r)
+    return grouped
+
+
+# Create or migrate the database. When the schema is current this is a
+# single PRAGMA user_version read on one connection.
+try:
+    _t0 = time.perf_counter()
+    _mc = sqlite3.connect(DB_PATH)
+    _applied = migrate(_mc)
+    # Write-ahead logging: readers keep working while a save is in progress.
+    # The journal mode is stored in the database file.
+    _mc.execute("PRAGMA journal_mode=WAL")
+    _mc.close()
+    print(f"Database schema v{SCHEMA_VERSION}: "
+          f"{', '.join(_applied) if _applied else 'up to date'} "
+          f"({(time.perf_counter() - _t0) * 1000:.1f} ms)")
+except Exception as e:
+    print(f"DB migration failed: {e}")
 
 
 @app.route("/")
@@ -218,16 +317,12 @@ def index():
 def api_get_customers():
     db = get_db()
     rows = db.execute("SELECT * FROM customers ORDER BY id").fetchall()
+    members = _members_by_parent(db, "customer")
     result = []
     for r in rows:
         c = dict(r)
-        members = db.execute(
-            "SELECT * FROM members WHERE parent_type='customer' AND parent_id=? ORDER BY id",
-            (r["id"],)
-        ).fetchall()
-        c["members"] = [dict(m) for m in members]
+        c["members"] = members.get(r["id"], [])
         result.append(c)
-    db.close()
     return jsonify(result)
 
 
@@ -241,7 +336,6 @@ def api_create_customer():
     )
     db.commit()
     cid = cur.lastrowid
-    db.close()
     return jsonify({"id": cid, "company": d["company"], "domain": d["domain"],
                      "address": d.get("address", ""), "phone": d.get("phone", ""),
                      "members": []}), 201
@@ -253,7 +347,6 @@ def api_delete_customer(cid):
     db.execute("DELETE FROM members WHERE parent_type='customer' AND parent_id=?", (cid,))
     db.execute("DELETE FROM customers WHERE id=?", (cid,))
     db.commit()
-    db.close()
     return jsonify({"ok": True})
 
 
@@ -263,16 +356,12 @@ def api_delete_customer(cid):
 def api_get_suppliers():
     db = get_db()
     rows = db.execute("SELECT * FROM suppliers ORDER BY id").fetchall()
+    members = _members_by_parent(db, "supplier")
     result = []
     for r in rows:
         s = dict(r)
-        members = db.execute(
-            "SELECT * FROM members WHERE parent_type='supplier' AND parent_id=? ORDER BY id",
-            (r["id"],)
-        ).fetchall()
-        s["members"] = [dict(m) for m in members]
+        s["members"] = members.get(r["id"], [])
         result.append(s)
-    db.close()
     return jsonify(result)
 
 
@@ -286,7 +375,6 @@ def api_create_supplier():
     )
     db.commit()
     sid = cur.lastrowid
-    db.close()
     return jsonify({"id": sid, "company": d["company"], "domain": d["domain"],
                      "address": d.get("address", ""), "phone": d.get("phone", ""),
                      "members": []}), 201
@@ -298,7 +386,6 @@ def api_delete_supplier(sid):
     db.execute("DELETE FROM members WHERE parent_type='supplier' AND parent_id=?", (sid,))
     db.execute("DELETE FROM suppliers WHERE id=?", (sid,))
     db.commit()
-    db.close()
     return jsonify({"ok": True})
 
 
@@ -314,7 +401,6 @@ def api_create_member():
     )
     db.commit()
     mid = cur.lastrowid
-    db.close()
     return jsonify({"id": mid, "parent_type": d["parent_type"], "parent_id": d["parent_id"],
                      "name": d["name"], "email": d["email"],
                      "role": d.get("role", ""), "phone": d.get("phone", "")}), 201
@@ -325,7 +411,6 @@ def api_delete_member(mid):
     db = get_db()
     db.execute("DELETE FROM members WHERE id=?", (mid,))
     db.commit()
-    db.close()
     return jsonify({"ok": True})
 
 
@@ -333,21 +418,104 @@ def api_delete_member(mid):
 
 @app.route("/api/templates", methods=["GET"])
 def api_get_templates():
+    """
+    List templates.
+
+    With no query parameters every template is returned in full. Options:
+      summary=1        light fields plus partitionCount/componentCount/hasBgImage
+      fields=a,b,...   only these keys (id is always included)
+      limit=N          page size; when more rows follow, the cursor for the
+                       next page is sent in the X-Next-Cursor header
+      after=ID         cursor: start after this template id
+    Heavy fields are served per template by /api/templates/<id>,
+    /api/templates/<id>/bg-image and /api/templates/<id>/components.
+    """
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in TEMPLATE_FIELDS + TEMPLATE_COUNT_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown field(s): {', '.join(unknown)}"}), 400
+        fields = ["id"] + [f for f in fields if f != "id"]
+    elif request.args.get("summary") in ("1", "true"):
+        fields = TEMPLATE_SUMMARY_FIELDS
+    else:
+        fields = None
+
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, TEMPLATE_PAGE_MAX))
+
     db = get_db()
-    rows = db.execute("SELECT * FROM templates ORDER BY id").fetchall()
+    # bg_image can be megabytes per row; only read it when it is returned
+    columns = "*" if fields is None or "bgImage" in fields else \
+        ", ".join(c for c in _TEMPLATE_COLUMNS if c != "bg_image") + \
+        ", bg_image != '' AND bg_image IS NOT NULL AS has_bg_image"
+    sql = f"SELECT {columns} FROM templates WHERE id > ? ORDER BY id"
+    if limit is not None:
+        rows = db.execute(sql + " LIMIT ?", (after, limit + 1)).fetchall()
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        rows = rows[:limit]
+    else:
+        rows = db.execute(sql, (after,)).fetchall()
+        next_cursor = None
+
+    ids = [r["id"] for r in rows]
+    want = set(TEMPLATE_FIELDS + TEMPLATE_COUNT_FIELDS) if fields is None else set(fields)
+    parts = comps = {}
+    if ids and "partitions" in want:
+        parts = _group_by_template(_select_in(
+            db, "SELECT * FROM partitions WHERE template_id IN ({}) ORDER BY template_id, id", ids))
+    if ids and "components" in want:
+        comps = _group_by_template(_select_in(
+            db, "SELECT * FROM components WHERE template_id IN ({}) ORDER BY template_id, page, sort_order", ids))
+    counts = {}
+    for name, table in (("partitionCount", "partitions"), ("componentCount", "components")):
+        if ids and fields is not None and name in fields:
+            counts[name] = dict(_select_in(
+                db, "SELECT template_id, COUNT(*) FROM " + table +
+                " WHERE template_id IN ({}) GROUP BY template_id", ids))
+
     result = []
     for r in rows:
-        parts = db.execute(
-            "SELECT * FROM partitions WHERE template_id=? ORDER BY id",
-            (r["id"],)
-        ).fetchall()
-        comps = db.execute(
-            "SELECT * FROM components WHERE template_id=? ORDER BY page, sort_order",
-            (r["id"],)
-        ).fetchall()
-        result.append(_template_to_dict(r, parts, comps))
-    db.close()
-    return jsonify(result)
+        if fields is None:
+            result.append(_template_to_dict(r, parts.get(r["id"], []), comps.get(r["id"], [])))
+            continue
+        t = _template_to_dict(r, parts.get(r["id"], []), comps.get(r["id"], []),
+                              include_bg="bgImage" in fields)
+        t["partitionCount"] = counts.get("partitionCount", {}).get(r["id"], 0)
+        t["componentCount"] = counts.get("componentCount", {}).get(r["id"], 0)
+        t["hasBgImage"] = bool(r["bg_image"]) if "bgImage" in fields else bool(r["has_bg_image"])
+        result.append({f: t[f] for f in fields})
+
+    resp = jsonify(result)
+    if next_cursor is not None:
+        resp.headers["X-Next-Cursor"] = str(next_cursor)
+    return resp
+
+
+@app.route("/api/templates/<int:tid>", methods=["GET"])
+def api_get_template(tid):
+    db = get_db()
+    row = db.execute("SELECT * FROM templates WHERE id=?", (tid,)).fetchone()
+    if row is None:
+        return jsonify({"error": "Template not found"}), 404
+    parts = db.execute(
+        "SELECT * FROM partitions WHERE template_id=? ORDER BY id", (tid,)
+    ).fetchall()
+    comps = db.execute(
+        "SELECT * FROM components WHERE template_id=? ORDER BY page, sort_order", (tid,)
+    ).fetchall()
+    return jsonify(_template_to_dict(row, parts, comps))
+
+
+@app.route("/api/templates/<int:tid>/bg-image", methods=["GET"])
+def api_get_template_bg(tid):
+    db = get_db()
+    row = db.execute("SELECT bg_image FROM templates WHERE id=?", (tid,)).fetchone()
+    if row is None:
+        return jsonify({"error": "Template not found"}), 404
+    return jsonify({"bgImage": row["bg_image"] or ""})
 
 
 @app.route("/api/templates", methods=["POST"])
@@ -371,7 +539,7 @@ def api_create_template():
          sew.get("position", "none"), sew.get("distance", 0), sew.get("padding", 0),
          fold.get("type", "none"), fold.get("padding", 0),
          pa.get("x", 0), pa.get("y", 0), pa.get("w", 0), pa.get("h", 0),
-         d.get("bgImage", ""), d.get("source", "drawing"))
+         store_bg_images(d.get("bgImage", "")), d.get("source", "drawing"))
     )
     tid = cur.lastrowid
     parts_out = []
@@ -386,7 +554,6 @@ def api_create_template():
                           "w": p["w"], "h": p["h"], "locked": p.get("locked", 0)})
     db.commit()
     row = db.execute("SELECT * FROM templates WHERE id=?", (tid,)).fetchone()
-    db.close()
     return jsonify(_template_to_dict(row, parts_out)), 201
 
 
@@ -396,7 +563,8 @@ def api_delete_template(tid):
     db.execute("DELETE FROM partitions WHERE template_id=?", (tid,))
     db.execute("DELETE FROM templates WHERE id=?", (tid,))
     db.commit()
-    db.close()
+    from tools.render_plan import drop_plan
+    drop_plan(tid)
     return jsonify({"ok": True})
 
 
@@ -415,14 +583,15 @@ def api_update_template(tid):
                pad_top=?, pad_bottom=?, pad_left=?, pad_right=?,
                sew_position=?, sew_distance=?, sew_padding=?,
                fold_type=?, fold_padding=?,
-               print_x=?, print_y=?, print_w=?, print_h=?, bg_image=?, source=?
+               print_x=?, print_y=?, print_w=?, print_h=?, bg_image=?, source=?,
+               revision=revision+1
                WHERE id=?""",
             (d["customerId"], d["name"], d["width"], d["height"], d["orientation"],
              pad.get("top", 0), pad.get("bottom", 0), pad.get("left", 0), pad.get("right", 0),
              sew.get("position", "none"), sew.get("distance", 0), sew.get("padding", 0),
              fold.get("type", "none"), fold.get("padding", 0),
              pa.get("x", 0), pa.get("y", 0), pa.get("w", 0), pa.get("h", 0),
-             d.get("bgImage", ""), d.get("source", "drawing"),
+             store_bg_images(d.get("bgImage", "")), d.get("source", "drawing"),
              tid)
         )
         db.execute("DELETE FROM partitions WHERE template_id=?", (tid,))
@@ -437,13 +606,12 @@ def api_update_template(tid):
                               "label": p["label"], "x": p["x"], "y": p["y"],
                               "w": p["w"], "h": p["h"], "locked": p.get("locked", 0)})
         db.commit()
+        _rebuild_render_plan(db, tid)
         row = db.execute("SELECT * FROM templates WHERE id=?", (tid,)).fetchone()
         return jsonify(_template_to_dict(row, parts_out))
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        db.close()
 
 
 @app.route("/api/templates/<int:tid>/partitions", methods=["PUT"])
@@ -452,7 +620,7 @@ def api_update_partitions(tid):
     db = get_db()
     # Save bg_image if provided
     if "bgImage" in d:
-        db.execute("UPDATE templates SET bg_image=? WHERE id=?", (d["bgImage"], tid))
+        db.execute("UPDATE templates SET bg_image=? WHERE id=?", (store_bg_images(d["bgImage"]), tid))
     db.execute("DELETE FROM partitions WHERE template_id=?", (tid,))
     parts_out = []
     for p in d.get("partitions", []):
@@ -467,7 +635,6 @@ def api_update_partitions(tid):
     db.commit()
     row = db.execute("SELECT bg_image FROM templates WHERE id=?", (tid,)).fetchone()
     bg = row["bg_image"] if row else ""
-    db.close()
     return jsonify({"partitions": parts_out, "bgImage": bg or ""})
 
 
@@ -480,8 +647,7 @@ def api_get_components(tid):
         "SELECT * FROM components WHERE template_id=? ORDER BY page, sort_order",
         (tid,)
     ).fetchall()
-    db.close()
-    return jsonify([dict(r) for r in rows])
+    return jsonify([_component_to_dict(r) for r in rows])
 
 
 @app.route("/api/templates/<int:tid>/components", methods=["PUT"])
@@ -489,27 +655,30 @@ def api_save_components(tid):
     try:
         d = request.get_json()
         db = get_db()
-        db.execute("UPDATE templates SET source='pdf' WHERE id=?", (tid,))
+        db.execute("UPDATE templates SET source='pdf', revision=revision+1 WHERE id=?", (tid,))
         db.execute("DELETE FROM components WHERE template_id=?", (tid,))
         out = []
         for i, c in enumerate(d.get("components", [])):
-            path_data_json = json.dumps(c["pathData"]) if c.get("pathData") else None
+            path_data = dump_path_data(c.get("pathData"))
             group_id = c.get("groupId")
             visible = 1 if c.get("visible", True) else 0
             locked = 1 if c.get("locked", False) else 0
+            content = c.get("content", "")
+            if c["type"] == "image" and c.get("dataUri"):
+                content = store_data_uri(c["dataUri"])
             cur = db.execute(
                 """INSERT INTO components
                    (template_id, partition_id, page, type, content, x, y, w, h,
                     font_family, font_size, sort_order, path_data, group_id, visible, locked)
                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
                 (tid, c.get("partitionId"), c.get("page", 0), c["type"],
-                 c.get("content", ""), c["x"], c["y"], c["w"], c["h"],
-                 c.get("fontFamily", "Arial"), c.get("fontSize", 8), i, path_data_json, group_id, visible, locked)
+                 content, c["x"], c["y"], c["w"], c["h"],
+                 c.get("fontFamily", "Arial"), c.get("fontSize", 8), i, path_data, group_id, visible, locked)
             )
             out.append({"id": cur.lastrowid, "template_id": tid,
                          "partition_id": c.get("partitionId"),
                          "page": c.get("page", 0), "type": c["type"],
-                         "content": c.get("content", ""),
+                         "content": content,
                          "x": c["x"], "y": c["y"], "w": c["w"], "h": c["h"],
                          "font_family": c.get("fontFamily", "Arial"),
                          "font_size": c.get("fontSize", 8), "sort_order": i,
@@ -518,7 +687,7 @@ def api_save_components(tid):
                          "visible": bool(visible),
                          "locked": bool(locked)})
         db.commit()
-        db.close()
+        _rebuild_render_plan(db, tid)
         return jsonify(out)
     except Exception as e:
         print(f"Error saving components: {e}")
@@ -528,6 +697,170 @@ def api_save_components(tid):
         return jsonify({"error": str(e)}), 500
 
 
+# Editor payload key -> components column, with the value conversion
+_COMPONENT_FIELDS = {
+    "partitionId": ("partition_id", None),
+    "page": ("page", None),
+    "type": ("type", None),
+    "content": ("content", None),
+    # Image components keep their asset URL in content
+    "dataUri": ("content", store_data_uri),
+    "x": ("x", None), "y": ("y", None), "w": ("w", None), "h": ("h", None),
+    "fontFamily": ("font_family", None),
+    "fontSize": ("font_size", None),
+    "sortOrder": ("sort_order", None),
+    "pathData": ("path_data", dump_path_data),
+    "groupId": ("group_id", None),
+    "visible": ("visible", lambda v: 1 if v else 0),
+    "locked": ("locked", lambda v: 1 if v else 0),
+}
+# As _COMPONENT_FIELDS, for edits applied to an export only: images stay
+# data URIs instead of being written to the asset store
+_EXPORT_COMPONENT_FIELDS = dict(_COMPONENT_FIELDS, dataUri=("content", None))
+_COMPONENT_INSERT_DEFAULTS = {
+    "partitionId": None, "page": 0, "content": "", "fontFamily": "Arial",
+    "fontSize": 8, "sortOrder": 0, "pathData": None, "groupId": None,
+    "visible": True, "locked": False,
+}
+
+
+def _component_columns(c, fields=_COMPONENT_FIELDS):
+    """Map the editor keys present in c to {column: value}."""
+    cols = {}
+    for key, (column, convert) in fields.items():
+        if key in c:
+            cols[column] = convert(c[key]) if convert else c[key]
+    return cols
+
+
+@app.route("/api/templates/<int:tid>/components", methods=["PATCH"])
+def api_patch_components(tid):
+    """
+    Apply an incremental component edit in one transaction.
+
+    Body (every key optional):
+      insert:  [{...component, "ref": any}]  new rows; ref is echoed back
+      update:  [{"id": n, ...changed keys}]  only the keys sent are written
+      delete:  [id, ...]
+      reorder: [{"id": n, "sortOrder": k}, ...]
+    Returns {"inserted": [...rows with ref], "updated": [...rows], "deleted": [...ids]}.
+    """
+    d = request.get_json() or {}
+    db = get_db()
+    try:
+        if not db.execute("SELECT 1 FROM templates WHERE id=?", (tid,)).fetchone():
+            return jsonify({"error": "Template not found"}), 404
+
+        inserted = []
+        for c in d.get("insert", []):
+            cols = _component_columns({**_COMPONENT_INSERT_DEFAULTS, **c})
+            for required in ("type", "x", "y", "w", "h"):
+                if required not in cols:
+                    raise ValueError(f"Inserted component is missing '{required}'")
+            cols["template_id"] = tid
+            names = ", ".join(cols)
+            cur = db.execute(
+                f"INSERT INTO components ({names}) VALUES ({', '.join('?' * len(cols))})",
+                tuple(cols.values()))
+            inserted.append((cur.lastrowid, c.get("ref")))
+
+        # Updates touching the same columns share one executemany
+        updates = {}
+        for c in d.get("update", []):
+            cols = _component_columns(c)
+            if cols:
+                updates.setdefault(tuple(cols), []).append(tuple(cols.values()) + (c["id"], tid))
+        for c in d.get("reorder", []):
+            updates.setdefault(("sort_order",), []).append((c["sortOrder"], c["id"], tid))
+        for columns, params in updates.items():
+            assignments = ", ".join(f"{col}=?" for col in columns)
+            cur = db.executemany(
+                f"UPDATE components SET {assignments} WHERE id=? AND template_id=?", params)
+            if cur.rowcount != len(params):
+                raise LookupError("Unknown component id")
+
+        deleted = list(d.get("delete", []))
+        if deleted:
+            cur = db.executemany("DELETE FROM components WHERE id=? AND template_id=?",
+                                 [(cid, tid) for cid in deleted])
+            if cur.rowcount != len(deleted):
+                raise LookupError("Unknown component id")
+
+        db.execute("UPDATE templates SET source='pdf', revision=revision+1 WHERE id=?", (tid,))
+        db.commit()
+    except LookupError as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 404
+    except (KeyError, TypeError, ValueError, sqlite3.Error) as e:
+        db.rollback()
+        return jsonify({"error": f"Invalid component edit: {e}"}), 400
+    _rebuild_render_plan(db, tid)
+
+    changed_ids = [cid for cid, _ in inserted] + sorted(
+        {p[-2] for params in updates.values() for p in params})
+    rows = {}
+    if changed_ids:
+        rows = {r["id"]: r for r in _select_in(
+            db, "SELECT * FROM components WHERE id IN ({})", changed_ids)}
+    updated_ids = [cid for cid in changed_ids[len(inserted):] if cid in rows]
+    return jsonify({
+        "inserted": [dict(_component_to_dict(rows[cid]), ref=ref) for cid, ref in inserted],
+        "updated": [_component_to_dict(rows[cid]) for cid in updated_ids],
+        "deleted": deleted,
+    })
+
+
+def _export_options_error(data):
+    """Return a 400 response if data has invalid export options, else None."""
+    from tools.display_list import export_copies
+    from tools.image_cache import export_dpi
+    try:
+        export_copies(data)
+        export_dpi(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return None
+
+
+def _send_export(data, mode, render, download_name):
+    """
+    Serve an export from the content-addressed cache, rendering on a miss.
+
+    The cache key doubles as the ETag, so a client that repeats an
+    unchanged export with If-None-Match gets a 304 without any rendering.
+    """
+    error = _export_options_error(data)
+    if error:
+        return error
+    key = export_key(data, mode)
+    if request.if_none_match.contains(key):
+        resp = app.response_class(status=304)
+        resp.set_etag(key)
+        return resp
+
+    out = _cached_export(key, render)
+    return send_file(out, as_attachment=True, download_name=download_name, etag=key)
+
+
+def _cached_export(key, render):
+    """
+    Return a file object holding the export for key, rendering on a miss.
+
+    Fresh renders go into a private SpooledTemporaryFile (in memory up to
+    EXPORT_SPOOL_LIMIT) so concurrent exports never share a path.
+    """
+    out = _export_cache.open(key)
+    if out is None:
+        out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_LIMIT, dir=TMP_DIR)
+        try:
+            render(out)
+            _export_cache.put(key, out)
+        except Exception:
+            out.close()
+            raise
+    return out
+
+
 @app.route("/export/pdf", methods=["POST"])
 def export_pdf():
     data = request.get_json()
@@ -536,9 +869,7 @@ def export_pdf():
 
     from tools.export_pdf import generate_pdf
 
-    out_path = os.path.join(TMP_DIR, "label_export.pdf")
-    generate_pdf(data, out_path)
-    return send_file(out_path, as_attachment=True, download_name="label.pdf")
+    return _send_export(data, "pdf", lambda out: generate_pdf(data, out), "label.pdf")
 
 
 @app.route("/export/ai", methods=["POST"])
@@ -550,11 +881,367 @@ def export_ai():
     outlined = data.get("outlined", False)
     from tools.export_ai import generate_ai
 
-    out_path = os.path.join(TMP_DIR, "label_export.ai")
-    generate_ai(data, out_path, outlined=outlined)
-
+    mode = "ai-outlined" if outlined else "ai-editable"
     dl_name = "label_outlined.ai" if outlined else "label_editable.ai"
-    return send_file(out_path, as_attachment=True, download_name=dl_name)
+    return _send_export(data, mode, lambda out: generate_ai(data, out, outlined=outlined), dl_name)
+
+
+# Formats of /export/bundle and /export/<format>/<tid>: name -> (export
+# mode, download name). Modes match the single-format endpoints, so
+# cached renders are shared.
+EXPORT_FORMATS = {
+    "pdf": ("pdf", "label.pdf"),
+    "ai": ("ai-editable", "label_editable.ai"),
+    "ai-outlined": ("ai-outlined", "label_outlined.ai"),
+    "svg": ("svg", "label.svg"),
+    "svg-outlined": ("svg-outlined", "label_outlined.svg"),
+}
+BUNDLE_DEFAULT_FORMATS = ("pdf", "ai", "ai-outlined")
+BUNDLE_WORKERS = 4
+
+# Payload keys an export by template id takes from its override body
+EXPORT_OPTIONS = ("imageDpi", "copies", "glyphReuse")
+
+
+def _format_renderer(fmt, display):
+    """Return a function writing one export format from a compiled display list."""
+    if fmt == "pdf":
+        from tools.export_pdf import render_pdf
+        return lambda out: render_pdf(display, out)
+    if fmt.startswith("ai"):
+        from tools.export_ai import render_ai
+        return lambda out: render_ai(display, out, outlined=fmt == "ai-outlined")
+    from tools.export_svg import render_svg
+    return lambda out: render_svg(display, out, outlined=fmt == "svg-outlined")
+
+
+def _send_bundle(data, formats, display=None):
+    """
+    Serve several formats of one label as a ZIP. The label is compiled
+    once, unless display already holds it, and the formats render in
+    parallel worker threads.
+    """
+    formats = list(dict.fromkeys(formats or BUNDLE_DEFAULT_FORMATS))
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        return jsonify({"error": f"Unsupported format: {unknown[0]}"}), 400
+
+    def render(out):
+        from concurrent.futures import ThreadPoolExecutor
+        from tools.display_list import compile_label
+
+        compiled = display or compile_label(data)
+        with ThreadPoolExecutor(max_workers=min(len(formats), BUNDLE_WORKERS)) as pool:
+            parts = [
+                (EXPORT_FORMATS[fmt][1], pool.submit(
+                    _cached_export, export_key(data, EXPORT_FORMATS[fmt][0]),
+                    _format_renderer(fmt, compiled)))
+                for fmt in formats
+            ]
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+                for name, future in parts:
+                    with future.result() as part, zf.open(name, "w") as dest:
+                        shutil.copyfileobj(part, dest)
+
+    return _send_export(data, "bundle:" + ",".join(formats), render, "label_bundle.zip")
+
+
+# Several formats of one label in a single ZIP. The payload is an export
+# payload plus an optional "formats" list (default BUNDLE_DEFAULT_FORMATS).
+@app.route("/export/bundle", methods=["POST"])
+def export_bundle():
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    formats = data.pop("formats", None)
+    # Per-format keys ignore the 'outlined' flag of the single-format
+    # payloads; the format name selects it here
+    data.pop("outlined", None)
+    return _send_bundle(data, formats)
+
+
+# Export of a saved template, loaded server-side so the client does not
+# upload the design. <fmt> is a key of EXPORT_FORMATS or "bundle". The
+# optional JSON body covers unsaved edits: insert/update/delete/reorder
+# as for PATCH /api/templates/<tid>/components (applied to the export
+# only, never saved), the EXPORT_OPTIONS keys, and "formats" for bundles.
+@app.route("/export/<fmt>/<int:tid>", methods=["GET", "POST"])
+def export_template(fmt, tid):
+    if fmt != "bundle" and fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 404
+
+    overrides = request.get_json(silent=True) or {}
+    options = {key: overrides[key] for key in EXPORT_OPTIONS if key in overrides}
+    error = _export_options_error(options)
+    if error:
+        return error
+    db = get_db()
+    display = None
+    if any(overrides.get(key) for key in ("insert", "update", "delete", "reorder")):
+        try:
+            data = _load_export_data(db, tid, overrides)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid component edit: {e}"}), 400
+        if data is None:
+            return jsonify({"error": "Template not found"}), 404
+        data.update(options)
+    else:
+        # Saved state: render the precompiled plan, keyed by its content
+        # hash instead of hashing the whole payload again
+        plan = _render_plan(db, tid)
+        if plan is None:
+            return jsonify({"error": "Template not found"}), 404
+        from tools.display_list import with_options
+        display = with_options(plan["display"], options)
+        data = dict(options, plan=plan["key"])
+
+    if fmt == "bundle":
+        return _send_bundle(data, overrides.get("formats"), display)
+
+    def render(out):
+        from tools.display_list import compile_label
+        _format_renderer(fmt, display or compile_label(data))(out)
+
+    mode, download_name = EXPORT_FORMATS[fmt]
+    return _send_export(data, mode, render, download_name)
+
+
+def _rows_format(explicit, filename, mimetype):
+    """Pick the row format from an explicit value, file extension or MIME type."""
+    if explicit:
+        return explicit.lower()
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if ext == ".csv":
+        return "csv"
+    if mimetype in ("application/x-ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    return "csv"
+
+
+def _batch_rows(params):
+    """
+    Return (rows stream, rows format, None) for a batch export request,
+    or (None, None, error response).
+    """
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("rows")
+        if upload is None:
+            return None, None, (jsonify({"error": "No rows file provided"}), 400)
+        raw_rows = upload.stream
+        rows_fmt = _rows_format(params.get("rowsFormat"), upload.filename, upload.mimetype)
+    else:
+        raw_rows = request.stream
+        rows_fmt = _rows_format(params.get("rowsFormat"), None, request.mimetype)
+
+    from tools.variable_data import ROW_FORMATS
+    if rows_fmt not in ROW_FORMATS:
+        return None, None, (jsonify({"error": f"Unsupported row format: {rows_fmt}"}), 400)
+    return raw_rows, rows_fmt, None
+
+
+class _TooManyRows(Exception):
+    pass
+
+
+def _capped_rows(rows, limit):
+    """Yield from rows, raising _TooManyRows on the row past limit."""
+    for n, row in enumerate(rows):
+        if n >= limit:
+            raise _TooManyRows()
+        yield row
+
+
+# Batch export: one label per row of field values, as a single multi-page file.
+# Either multipart/form-data with a "rows" file plus "template" (export payload
+# JSON) or "templateId", or a raw CSV/NDJSON body with ?templateId=.
+# The file is rendered in full, then sent; batches over BATCH_SYNC_MAX_ROWS
+# answer 413 and go to /export/jobs/batch/<fmt> instead.
+@app.route("/export/batch/<fmt>", methods=["POST"])
+def export_batch(fmt):
+    if fmt not in ("pdf", "ai"):
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 404
+
+    params = request.values
+    raw_rows, rows_fmt, error = _batch_rows(params)
+    if error:
+        return error
+
+    # The static layer compiled once, and the components filled per row
+    if params.get("template"):
+        try:
+            data = json.loads(params["template"])
+        except ValueError:
+            return jsonify({"error": "Invalid template JSON"}), 400
+        error = _export_options_error(data)
+        if error:
+            return error
+        from tools.display_list import compile_page
+        from tools.variable_data import split_components
+        static, variable = split_components(data.get("components", []))
+        display = compile_page(data, static)
+    elif params.get("templateId"):
+        plan = _render_plan(get_db(), params.get("templateId", type=int))
+        if plan is None:
+            return jsonify({"error": "Template not found"}), 404
+        display, variable = plan["static"], plan["variable"]
+    else:
+        return jsonify({"error": "No template provided"}), 400
+
+    from tools.variable_data import iter_rows
+    outlined = params.get("outlined", "").lower() in ("1", "true", "yes")
+    rows = iter_rows(io.TextIOWrapper(raw_rows, encoding="utf-8-sig", newline=""), rows_fmt)
+    rows = _capped_rows(rows, BATCH_SYNC_MAX_ROWS)
+
+    out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_LIMIT, dir=TMP_DIR)
+    try:
+        if fmt == "pdf":
+            from tools.export_pdf import render_pdf_batch
+            render_pdf_batch(display, variable, rows, out)
+            dl_name = "labels.pdf"
+        else:
+            from tools.export_ai import render_ai_batch
+            render_ai_batch(display, variable, rows, out, outlined=outlined)
+            dl_name = "labels_outlined.ai" if outlined else "labels_editable.ai"
+        out.seek(0)
+    except (ValueError, csv.Error) as e:
+        out.close()
+        return jsonify({"error": str(e)}), 400
+    except _TooManyRows:
+        out.close()
+        return jsonify({
+            "error": f"Batch exceeds {BATCH_SYNC_MAX_ROWS} rows; "
+                     f"submit it to /export/jobs/batch/{fmt} instead",
+            "maxRows": BATCH_SYNC_MAX_ROWS,
+            "jobUrl": f"/export/jobs/batch/{fmt}"}), 413
+    except Exception:
+        out.close()
+        raise
+    return send_file(out, as_attachment=True, download_name=dl_name)
+
+
+# Export jobs: long exports run in the background in a bounded process
+# pool (tools/export_jobs.py). Submitting answers 202 with the job status;
+# clients poll GET /export/jobs/<id> and download from its "result" URL.
+# A full queue answers 429, unavailable workers 503, both with Retry-After.
+def _job_response(status, code=200):
+    status = dict(status, statusUrl=f"/export/jobs/{status['id']}")
+    if status["state"] == "done":
+        status["resultUrl"] = f"/export/jobs/{status['id']}/result"
+    resp = jsonify(status)
+    resp.status_code = code
+    if code == 202:
+        resp.headers["Location"] = status["statusUrl"]
+    return resp
+
+
+def _submit_job(fmt, data, download_name, rows=None, rows_fmt=None):
+    try:
+        job_id = _export_jobs.submit(fmt, data, download_name, rows, rows_fmt)
+    except JobRejected as e:
+        resp = jsonify({"error": str(e)})
+        resp.status_code = e.status
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp
+    return _job_response(_export_jobs.status(job_id), 202)
+
+
+# Body: an export payload plus "format" (a key of EXPORT_FORMATS, default
+# "pdf"), or {"templateId": n, "format": ...} with the overrides of
+# /export/<format>/<tid>.
+@app.route("/export/jobs", methods=["POST"])
+def export_job_submit():
+    d = request.get_json()
+    if not d:
+        return jsonify({"error": "No data provided"}), 400
+
+    fmt = d.pop("format", "pdf")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+    d.pop("outlined", None)
+    if "templateId" in d:
+        try:
+            data = _load_export_data(get_db(), d["templateId"], d)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid component edit: {e}"}), 400
+        if data is None:
+            return jsonify({"error": "Template not found"}), 404
+        data.update({key: d[key] for key in EXPORT_OPTIONS if key in d})
+    else:
+        data = d
+    error = _export_options_error(data)
+    if error:
+        return error
+    return _submit_job(fmt, data, EXPORT_FORMATS[fmt][1])
+
+
+# Takes the same input as /export/batch/<fmt>.
+@app.route("/export/jobs/batch/<fmt>", methods=["POST"])
+def export_job_submit_batch(fmt):
+    if fmt not in ("pdf", "ai"):
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 404
+
+    params = request.values
+    raw_rows, rows_fmt, error = _batch_rows(params)
+    if error:
+        return error
+
+    if params.get("template"):
+        try:
+            data = json.loads(params["template"])
+        except ValueError:
+            return jsonify({"error": "Invalid template JSON"}), 400
+    elif params.get("templateId"):
+        data = _load_export_data(get_db(), params.get("templateId", type=int))
+        if data is None:
+            return jsonify({"error": "Template not found"}), 404
+    else:
+        return jsonify({"error": "No template provided"}), 400
+
+    if fmt == "pdf":
+        dl_name = "labels.pdf"
+    elif params.get("outlined", "").lower() in ("1", "true", "yes"):
+        fmt, dl_name = "ai-outlined", "labels_outlined.ai"
+    else:
+        dl_name = "labels_editable.ai"
+    error = _export_options_error(data)
+    if error:
+        return error
+    return _submit_job(fmt, data, dl_name, raw_rows, rows_fmt)
+
+
+@app.route("/export/jobs/<job_id>", methods=["GET"])
+def export_job_status(job_id):
+    status = _export_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return _job_response(status)
+
+
+@app.route("/export/jobs/<job_id>", methods=["DELETE"])
+def export_job_cancel(job_id):
+    status = _export_jobs.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return _job_response(status)
+
+
+@app.route("/export/jobs/<job_id>/result", methods=["GET"])
+def export_job_result(job_id):
+    status = _export_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    result = _export_jobs.result(job_id)
+    if result is None:
+        return jsonify({"error": f"Job is {status['state']}"}), 409
+    path, download_name = result
+    return send_file(path, as_attachment=True, download_name=download_name)
 
 
 @app.route("/upload/image", methods=["POST"])
@@ -565,13 +1252,49 @@ def upload_image():
     if f.filename == "":
         return jsonify({"error": "No file selected"}), 400
 
-    import base64
+    data = f.read()
+    try:
+        validate_image(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    img_data = f.read()
-    mime = f.content_type or "image/png"
-    b64 = base64.b64encode(img_data).decode("utf-8")
-    data_uri = f"data:{mime};base64,{b64}"
-    return jsonify({"dataUri": data_uri})
+    asset_id = put_asset(data)
+    url = asset_url(asset_id)
+    # dataUri is kept for older clients; it now holds the asset URL
+    return jsonify({"assetId": asset_id, "url": url, "dataUri": url})
+
+
+@app.route("/assets/<asset_id>", methods=["GET"])
+def get_asset(asset_id):
+    path = asset_path(asset_id)
+    if path is None:
+        return jsonify({"error": "Asset not found"}), 404
+    with open(path, "rb") as f:
+        mime = sniff_mime(f.read(16))
+    resp = send_file(path, mimetype=mime, etag=asset_id, max_age=ASSET_MAX_AGE,
+                     conditional=True)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    # Never let a stored file be sniffed into, or run as, a document
+    resp.headers["X-Content-Type-Options"] = "nosniff"
+    resp.headers["Content-Security-Policy"] = ASSET_CSP
+    return resp
+
+
+# ==================== Stats API ====================
+
+@app.route("/api/stats", methods=["GET"])
+def api_get_stats():
+    from tools.barcodes import cache_stats as barcode_cache_stats
+    from tools.display_list import cache_stats as display_cache_stats
+    from tools.font_cache import cache_stats as font_cache_stats
+    from tools.image_cache import cache_stats as image_cache_stats
+    from tools.render_plan import cache_stats as plan_cache_stats
+    from tools.text_layout import cache_stats as layout_cache_stats
+    return jsonify({"fontCache": font_cache_stats(), "imageCache": image_cache_stats(),
+                    "barcodeCache": barcode_cache_stats(), "layoutCache": layout_cache_stats(),
+                    "displayCache": display_cache_stats(), "renderPlans": plan_cache_stats(),
+                    "exportCache": _export_cache.stats(), "exportJobs": _export_jobs.stats()})
 
 
 if __name__ == "__main__":
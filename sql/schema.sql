@@ -45,7 +45,8 @@ CREATE TABLE IF NOT EXISTS templates (
     print_w REAL DEFAULT 0,
     print_h REAL DEFAULT 0,
     bg_image TEXT DEFAULT '',
-    source TEXT DEFAULT 'drawing'
+    source TEXT DEFAULT 'drawing',
+    revision INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS partitions (
@@ -74,8 +75,18 @@ CREATE TABLE IF NOT EXISTS components (
     font_family TEXT DEFAULT 'Arial',
     font_size REAL DEFAULT 8,
     sort_order INTEGER DEFAULT 0,
-    path_data TEXT DEFAULT NULL,
+    path_data BLOB DEFAULT NULL,  -- packed by tools/pathpack.py
     group_id TEXT DEFAULT NULL,
     visible INTEGER DEFAULT 1,
     locked INTEGER DEFAULT 0
 );
+
+-- Lookups by parent; also used by the ON DELETE actions above
+CREATE INDEX IF NOT EXISTS idx_members_parent ON members(parent_type, parent_id);
+CREATE INDEX IF NOT EXISTS idx_templates_customer ON templates(customer_id);
+CREATE INDEX IF NOT EXISTS idx_partitions_template ON partitions(template_id);
+CREATE INDEX IF NOT EXISTS idx_components_template ON components(template_id, page, sort_order);
+CREATE INDEX IF NOT EXISTS idx_components_partition ON components(partition_id);
+
+-- Schema version for tools/migrate.py; keep equal to its SCHEMA_VERSION
+PRAGMA user_version = 9;
@@ -1091,13 +1091,17 @@
 
     /* ===== Template Selection ===== */
     function loadTemplate(tplId) {
-        var tpl = null;
-        App.store.templates.forEach(function (t) { if (t.id === tplId) tpl = t; });
-        if (!tpl) return;
+        App.loadFullTemplate(tplId).then(openTemplate).catch(function (err) {
+            App.showToast("Failed to load template: " + err.message, true);
+        });
+    }
+
+    function openTemplate(tpl) {
         compTpl = tpl;
         compPage = 0;
         components = (tpl.components || []).map(function (c) {
             var comp = {
+                id: c.id, sortOrder: c.sort_order,
                 page: c.page || 0, partitionLabel: c.partition_label || c.partitionLabel || "",
                 type: c.type, content: c.content || "",
                 x: c.x, y: c.y, w: c.w, h: c.h,
@@ -1133,6 +1137,60 @@
     }
 
     /* ===== Save / Reset ===== */
+    function componentPayload(c) {
+        var obj = {
+            page: c.page, partitionLabel: c.partitionLabel,
+            type: c.type, content: c.content,
+            x: c.x, y: c.y, w: c.w, h: c.h,
+            fontFamily: c.fontFamily, fontSize: c.fontSize,
+            groupId: c.groupId || null,
+            visible: c.visible !== false && c.visible !== 0,
+            locked: !!c.locked
+        };
+        if (c.type === "pdfpath" && c.pathData) obj.pathData = c.pathData;
+        if (c.type === "image" && c.dataUri) obj.dataUri = c.dataUri;
+        return obj;
+    }
+
+    /* Insert/update/delete/reorder operations that turn savedComponents
+       into components, keyed by database id; null if nothing changed.
+       Components without an id (or copies sharing one) are inserts. */
+    function diffComponents() {
+        var saved = {};
+        savedComponents.forEach(function (c) {
+            if (c.id) saved[c.id] = componentPayload(c);
+        });
+        var edit = { insert: [], update: [], delete: [], reorder: [] };
+        var seen = {};
+        components.forEach(function (c, i) {
+            var obj = componentPayload(c);
+            var prev = c.id && !seen[c.id] ? saved[c.id] : null;
+            if (!prev) {
+                delete c.id;
+                obj.sortOrder = i;
+                obj.ref = i;
+                edit.insert.push(obj);
+                return;
+            }
+            seen[c.id] = true;
+            var changed = { id: c.id };
+            var dirty = false;
+            Object.keys(obj).forEach(function (k) {
+                if (JSON.stringify(obj[k]) !== JSON.stringify(prev[k])) {
+                    changed[k] = obj[k];
+                    dirty = true;
+                }
+            });
+            if (dirty) edit.update.push(changed);
+            if (c.sortOrder !== i) edit.reorder.push({ id: c.id, sortOrder: i });
+        });
+        Object.keys(saved).forEach(function (id) {
+            if (!seen[id]) edit.delete.push(parseInt(id));
+        });
+        if (!edit.insert.length && !edit.update.length && !edit.delete.length && !edit.reorder.length) return null;
+        return edit;
+    }
+
     function saveComponents() {
         console.log("saveComponents called, compTpl:", compTpl, "components.length:", components.length);
         if (!compTpl) {
@@ -1144,26 +1202,20 @@
             return;
         }
 
-        var compPayload = {
-            components: components.map(function (c) {
-                var obj = {
-                    page: c.page, partitionLabel: c.partitionLabel,
-                    type: c.type, content: c.content,
-                    x: c.x, y: c.y, w: c.w, h: c.h,
-                    fontFamily: c.fontFamily, fontSize: c.fontSize,
-                    groupId: c.groupId || null,
-                    visible: c.visible !== false && c.visible !== 0,
-                    locked: !!c.locked
-                };
-                if (c.type === "pdfpath" && c.pathData) obj.pathData = c.pathData;
-                return obj;
-            })
-        };
+        var compPayload = { components: components.map(componentPayload) };
 
         if (compTpl.id) {
-            /* Existing template — save components directly */
-            App.api("PUT", "/api/templates/" + compTpl.id + "/components", compPayload).then(function () {
+            /* Existing template — send only what changed since the last save */
+            var edit = diffComponents();
+            if (!edit) {
+                App.showToast("No changes to save");
+                return;
+            }
+            App.api("PATCH", "/api/templates/" + compTpl.id + "/components", edit).then(function (resp) {
+                resp.inserted.forEach(function (row) { components[row.ref].id = row.id; });
+                components.forEach(function (c, i) { c.sortOrder = i; });
                 savedComponents = JSON.parse(JSON.stringify(components));
+                App.invalidateTemplate(compTpl.id);
                 App.showToast("Components saved");
             }).catch(function (err) {
                 App.showToast("Save failed: " + err.message, true);
@@ -1189,8 +1241,10 @@
                 compTpl.id = saved.id;
                 App.store.templates.push(saved);
                 return App.api("PUT", "/api/templates/" + saved.id + "/components", compPayload);
-            }).then(function () {
+            }).then(function (rows) {
+                rows.forEach(function (row, i) { components[i].id = row.id; components[i].sortOrder = i; });
                 savedComponents = JSON.parse(JSON.stringify(components));
+                App.invalidateTemplate(compTpl.id);
                 App.showToast("Template and components saved");
                 if (App.renderTemplateTable) App.renderTemplateTable();
             }).catch(function (err) {
@@ -1207,14 +1261,26 @@
     }
 
     /* ===== Export ===== */
+    /* Last download per export kind, reused when the server answers 304 */
+    var lastExports = {};
+
     function exportFile(url, body, filename) {
+        var kind = url + (body.outlined ? ":outlined" : "");
+        var prev = lastExports[kind];
+        var headers = { "Content-Type": "application/json" };
+        if (prev) headers["If-None-Match"] = prev.etag;
         fetch(url, {
             method: "POST",
-            headers: { "Content-Type": "application/json" },
+            headers: headers,
             body: JSON.stringify(body)
         }).then(function (r) {
+            if (r.status === 304 && prev) return prev.blob;
             if (!r.ok) throw new Error("Export failed");
-            return r.blob();
+            var etag = r.headers.get("ETag");
+            return r.blob().then(function (blob) {
+                if (etag) lastExports[kind] = { etag: etag, blob: blob };
+                return blob;
+            });
         }).then(function (blob) {
             var a = document.createElement("a");
             a.href = URL.createObjectURL(blob);
@@ -1226,6 +1292,18 @@
         });
     }
 
+    /* Saved templates export server-side by id, sending only unsaved
+       edits; an unsaved PDF import still uploads the whole label. */
+    function exportLabel(format, filename) {
+        if (compTpl.id) {
+            exportFile("/export/" + format + "/" + compTpl.id, diffComponents() || {}, filename);
+        } else if (format === "pdf") {
+            exportFile("/export/pdf", buildExportData(false), filename);
+        } else {
+            exportFile("/export/ai", buildExportData(format === "ai-outlined"), filename);
+        }
+    }
+
     function buildExportData(outlined) {
         var data = {
             label: { width: compTpl.width, height: compTpl.height },
@@ -1350,15 +1428,15 @@
         /* Export buttons */
         document.getElementById("btn-export-pdf").addEventListener("click", function () {
             if (!compTpl) return;
-            exportFile("/export/pdf", buildExportData(false), compTpl.name + ".pdf");
+            exportLabel("pdf", compTpl.name + ".pdf");
         });
         document.getElementById("btn-export-ai").addEventListener("click", function () {
             if (!compTpl) return;
-            exportFile("/export/ai", buildExportData(false), compTpl.name + "_editable.ai");
+            exportLabel("ai", compTpl.name + "_editable.ai");
         });
         document.getElementById("btn-export-ai-outlined").addEventListener("click", function () {
             if (!compTpl) return;
-            exportFile("/export/ai", buildExportData(true), compTpl.name + "_outlined.ai");
+            exportLabel("ai-outlined", compTpl.name + "_outlined.ai");
         });
     }
 
@@ -25,6 +25,28 @@
             });
         },
 
+        /* Full template (partitions, components, bgImage) for a store entry.
+           The store is loaded with summaries; details are fetched on demand. */
+        loadFullTemplate: function (id) {
+            var idx = App.store.templates.findIndex(function (t) { return t.id === id; });
+            if (idx !== -1 && App.store.templates[idx]._full) {
+                return Promise.resolve(App.store.templates[idx]);
+            }
+            return App.api("GET", "/api/templates/" + id).then(function (tpl) {
+                tpl._full = true;
+                var i = App.store.templates.findIndex(function (t) { return t.id === id; });
+                if (i !== -1) App.store.templates[i] = tpl;
+                return tpl;
+            });
+        },
+
+        /* Forget a template's cached details (after its components are
+           saved) so the next loadFullTemplate fetches the stored rows. */
+        invalidateTemplate: function (id) {
+            var tpl = App.store.templates.find(function (t) { return t.id === id; });
+            if (tpl) delete tpl._full;
+        },
+
         /* Utilities */
         esc: function (s) {
             var d = document.createElement("div");
@@ -5,7 +5,7 @@
     Promise.all([
         App.api("GET", "/api/customers"),
         App.api("GET", "/api/suppliers"),
-        App.api("GET", "/api/templates")
+        App.api("GET", "/api/templates?summary=1")
     ]).then(function (results) {
         App.store.customers = results[0];
         App.store.suppliers = results[1];
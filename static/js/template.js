@@ -653,8 +653,8 @@
         if (t.bgImage) {
             var bgMap = {};
             try { bgMap = JSON.parse(t.bgImage); } catch (e) {
-                /* backward compat: plain data URL → assign to page 0 */
-                if (t.bgImage.indexOf("data:") === 0) bgMap = { "0": t.bgImage };
+                /* backward compat: plain data URL or asset URL → assign to page 0 */
+                if (t.bgImage.indexOf("data:") === 0 || t.bgImage.indexOf("/assets/") === 0) bgMap = { "0": t.bgImage };
             }
             /* Only load bg images for pages that still have partitions */
             var existingPages = {};
@@ -705,7 +705,7 @@
             var cust = App.store.customers.find(function (c) { return c.id === parseInt(t.customerId); });
             var custName = cust ? cust.company : "\u2014";
             var tr = document.createElement("tr");
-            tr.innerHTML = "<td>" + App.esc(t.name) + "</td><td>" + App.esc(custName) + "</td><td>" + t.width + "x" + t.height + " mm</td><td>" + App.esc(t.orientation) + "</td><td>" + App.esc(t.folding.type) + "</td><td>" + App.esc(t.source || "drawing") + "</td><td>" + t.partitions.length + "</td><td><button class='btn-outline' style='padding:2px 8px;font-size:11px'>Delete</button></td>";
+            tr.innerHTML = "<td>" + App.esc(t.name) + "</td><td>" + App.esc(custName) + "</td><td>" + t.width + "x" + t.height + " mm</td><td>" + App.esc(t.orientation) + "</td><td>" + App.esc(t.folding.type) + "</td><td>" + App.esc(t.source || "drawing") + "</td><td>" + (t.partitions ? t.partitions.length : t.partitionCount) + "</td><td><button class='btn-outline' style='padding:2px 8px;font-size:11px'>Delete</button></td>";
             tr.querySelector("button").addEventListener("click", function (e) {
                 e.stopPropagation();
                 App.api("DELETE", "/api/templates/" + t.id).then(function () {
@@ -727,7 +727,9 @@
                     if (App.loadComponentTemplate) App.loadComponentTemplate(t.id);
                 } else {
                     /* Load into Drawing tab */
-                    App.loadTemplateForEditing(t);
+                    App.loadFullTemplate(t.id).then(App.loadTemplateForEditing).catch(function (err) {
+                        App.showToast("Failed to load template: " + err.message, true);
+                    });
                 }
             });
             tbody.appendChild(tr);
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def asset_dir(tmp_path):
+    from tools.assets import set_asset_dir
+
+    path = str(tmp_path / "assets")
+    set_asset_dir(path)
+    return path
+
+
+@pytest.fixture
+def client(tmp_path, asset_dir, monkeypatch):
+    """Test client on a fresh database and asset store."""
+    import app as app_module
+    from tools.migrate import migrate
+
+    db_path = str(tmp_path / "app.db")
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.close()
+    monkeypatch.setattr(app_module, "DB_PATH", db_path)
+    return app_module.app.test_client()
+
+
+def _seed(db_path, n):
+    """Create n customers, suppliers and templates, each with children."""
+    from tools.migrate import migrate
+
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    for i in range(n):
+        cid = conn.execute(
+            "INSERT INTO customers (company, domain) VALUES (?, ?)",
+            (f"Customer {i}", f"c{i}.example")).lastrowid
+        sid = conn.execute(
+            "INSERT INTO suppliers (company, domain) VALUES (?, ?)",
+            (f"Supplier {i}", f"s{i}.example")).lastrowid
+        for parent_type, pid in (("customer", cid), ("supplier", sid)):
+            conn.executemany(
+                "INSERT INTO members (parent_type, parent_id, name, email) VALUES (?, ?, ?, ?)",
+                [(parent_type, pid, f"Member {j}", f"m{j}@example") for j in range(2)])
+        tid = conn.execute(
+            "INSERT INTO templates (customer_id, name, width, height) VALUES (?, ?, 50, 30)",
+            (cid, f"Template {i}")).lastrowid
+        conn.execute(
+            "INSERT INTO partitions (template_id, label, x, y, w, h) VALUES (?, 'A', 0, 0, 50, 30)",
+            (tid,))
+        conn.executemany(
+            "INSERT INTO components (template_id, type, content, sort_order) VALUES (?, 'text', ?, ?)",
+            [(tid, f"Text {j}", j) for j in range(3)])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def seeded_db(tmp_path):
+    """Return seed(n): the path of a database with n customers, suppliers and templates."""
+    def seed(n):
+        db_path = str(tmp_path / f"seeded_{n}.db")
+        if not os.path.exists(db_path):
+            _seed(db_path, n)
+        return db_path
+    return seed
+
+
+@pytest.fixture
+def traced_request(asset_dir, monkeypatch):
+    """
+    Return request(db_path, method, url, json=None): run one request on
+    db_path and return (status, list of SQL statements it executed).
+    """
+    import app as app_module
+
+    get_db = app_module.get_db
+    statements = []
+
+    def traced_get_db():
+        conn = get_db()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(app_module, "get_db", traced_get_db)
+
+    def request(db_path, method, url, json=None):
+        monkeypatch.setattr(app_module, "DB_PATH", db_path)
+        del statements[:]
+        resp = app_module.app.test_client().open(url, method=method, json=json)
+        return resp.status_code, list(statements)
+
+    yield request
+    get_db().set_trace_callback(None)
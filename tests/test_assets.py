@@ -0,0 +1,56 @@
+import io
+
+import pytest
+from PIL import Image
+
+from tools.assets import sniff_mime, validate_image
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+
+
+def _image(fmt):
+    out = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(out, fmt)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("fmt, mime", [
+    ("PNG", "image/png"), ("JPEG", "image/jpeg"), ("GIF", "image/gif"), ("WEBP", "image/webp"),
+])
+def test_raster_formats_accepted(fmt, mime):
+    data = _image(fmt)
+    assert validate_image(data) == mime
+    assert sniff_mime(data) == mime
+
+
+@pytest.mark.parametrize("data", [SVG, b"<html><script>alert(1)</script></html>", _image("BMP")])
+def test_other_content_rejected(data):
+    with pytest.raises(ValueError):
+        validate_image(data)
+    assert sniff_mime(data) == "application/octet-stream"
+
+
+def test_upload_rejects_svg(client):
+    resp = client.post("/upload/image", data={"file": (io.BytesIO(SVG), "x.svg")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 400
+
+
+def test_uploaded_image_served_with_safe_headers(client):
+    resp = client.post("/upload/image", data={"file": (io.BytesIO(_image("PNG")), "x.png")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 200
+
+    resp = client.get(resp.json["url"])
+    assert resp.status_code == 200
+    assert resp.mimetype == "image/png"
+    assert resp.headers["X-Content-Type-Options"] == "nosniff"
+    assert "default-src 'none'" in resp.headers["Content-Security-Policy"]
+
+
+def test_stored_markup_served_as_octet_stream(client):
+    from tools.assets import put_asset
+
+    resp = client.get("/assets/" + put_asset(SVG))
+    assert resp.mimetype == "application/octet-stream"
+    assert resp.headers["X-Content-Type-Options"] == "nosniff"
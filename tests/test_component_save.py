@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _text(content, y):
+    return {"type": "text", "content": content, "x": 1, "y": y, "w": 20, "h": 5}
+
+
+def _template(client):
+    cust = client.post("/api/customers", json={"company": "c", "domain": "c.test"}).json
+    return client.post("/api/templates", json={
+        "customerId": cust["id"], "name": "t", "width": 30, "height": 50,
+        "orientation": "vertical"}).json["id"]
+
+
+def test_save_reopen_save(client):
+    tid = _template(client)
+    client.put(f"/api/templates/{tid}/components", json={"components": [_text("a", 1), _text("b", 8)]})
+
+    # Reopen: the editor diffs against the rows the server now holds
+    a, b = client.get(f"/api/templates/{tid}").json["components"]
+    resp = client.patch(f"/api/templates/{tid}/components", json={
+        "insert": [dict(_text("c", 15), ref=0)],
+        "update": [{"id": a["id"], "content": "A"}],
+        "delete": [b["id"]]})
+    assert resp.status_code == 200
+
+    rows = client.get(f"/api/templates/{tid}").json["components"]
+    resp = client.patch(f"/api/templates/{tid}/components", json={
+        "update": [{"id": rows[1]["id"], "content": "C"}]})
+    assert resp.status_code == 200
+
+    rows = client.get(f"/api/templates/{tid}").json["components"]
+    assert [r["content"] for r in rows] == ["A", "C"]
+
+
+# The store keeps full templates cached; a save must make the next open refetch
+STORE_SCRIPT = """
+const fs = require("fs"), vm = require("vm");
+const responses = %s;
+let fetches = 0;
+const ctx = { fetch: () => Promise.resolve({
+    ok: true, json: () => Promise.resolve(JSON.parse(JSON.stringify(responses[fetches++]))) }) };
+ctx.window = ctx;
+vm.createContext(ctx);
+vm.runInContext(fs.readFileSync(%s, "utf8"), ctx);
+const App = ctx.App;
+App.store.templates = [{ id: 1 }];
+(async () => {
+    const first = await App.loadFullTemplate(1);
+    const cached = await App.loadFullTemplate(1);
+    App.invalidateTemplate(1);
+    const reopened = await App.loadFullTemplate(1);
+    console.log(JSON.stringify({ fetches, first: first.components, cached: cached.components,
+                                 reopened: reopened.components }));
+})();
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_reopen_after_save_refetches_components():
+    before = {"id": 1, "components": [{"id": 1}]}
+    after = {"id": 1, "components": [{"id": 2}, {"id": 3}]}
+    script = STORE_SCRIPT % (json.dumps([before, after]),
+                             json.dumps(os.path.join(ROOT, "static", "js", "core.js")))
+    out = json.loads(subprocess.run(["node", "-e", script], capture_output=True, text=True,
+                                    check=True).stdout)
+    assert out["fetches"] == 2
+    assert out["cached"] == out["first"] == before["components"]
+    assert out["reopened"] == after["components"]
@@ -0,0 +1,31 @@
+import json
+
+import app as app_module
+
+TEMPLATE = json.dumps({
+    "label": {"width": 30, "height": 50},
+    "components": [{"type": "text", "field": "name", "x": 1, "y": 1, "w": 20, "h": 5}],
+})
+
+
+def _rows(n):
+    return "name\n" + "".join(f"n{i}\n" for i in range(n))
+
+
+def _post(client, n):
+    return client.post(f"/export/batch/pdf?template={TEMPLATE}", data=_rows(n),
+                       content_type="text/csv")
+
+
+def test_batch_within_cap_renders(client, monkeypatch):
+    monkeypatch.setattr(app_module, "BATCH_SYNC_MAX_ROWS", 3)
+    resp = _post(client, 3)
+    assert resp.status_code == 200
+    assert resp.data.startswith(b"%PDF")
+
+
+def test_batch_over_cap_points_to_jobs(client, monkeypatch):
+    monkeypatch.setattr(app_module, "BATCH_SYNC_MAX_ROWS", 3)
+    resp = _post(client, 4)
+    assert resp.status_code == 413
+    assert resp.json["jobUrl"] == "/export/jobs/batch/pdf"
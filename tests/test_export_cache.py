@@ -0,0 +1,25 @@
+import io
+
+from tools import export_cache
+from tools.export_cache import ExportCache, export_key
+
+DATA = {"label": {"width": 30, "height": 50}, "components": []}
+
+
+def test_key_depends_on_render_version(monkeypatch):
+    before = export_key(DATA, "pdf")
+    monkeypatch.setattr(export_cache, "RENDER_VERSION", export_cache.RENDER_VERSION + 1)
+    assert export_key(DATA, "pdf") != before
+
+
+def test_key_depends_on_mode_and_payload():
+    assert export_key(DATA, "pdf") != export_key(DATA, "ai-editable")
+    assert export_key(DATA, "pdf") != export_key(dict(DATA, copies=2), "pdf")
+
+
+def test_overwrite_counts_disk_bytes_once(tmp_path):
+    cache = ExportCache(str(tmp_path))
+    cache.put("k", io.BytesIO(b"x" * 100))
+    cache.put("k", io.BytesIO(b"y" * 40))
+    assert cache.stats()["disk_bytes"] == 40
+    assert cache.open("k").read() == b"y" * 40
@@ -0,0 +1,58 @@
+import pytest
+
+from tools.display_list import MAX_COPIES, export_copies
+from tools.image_cache import DEFAULT_IMAGE_DPI, MAX_IMAGE_DPI, MIN_IMAGE_DPI, export_dpi
+
+LABEL = {"label": {"width": 30, "height": 50},
+         "components": [{"type": "text", "content": "A", "x": 1, "y": 1, "w": 20, "h": 5}]}
+
+
+@pytest.mark.parametrize("copies, expected", [(None, 1), (1, 1), ("3", 3), (MAX_COPIES, MAX_COPIES)])
+def test_copies_parsed(copies, expected):
+    data = {} if copies is None else {"copies": copies}
+    assert export_copies(data) == expected
+
+
+@pytest.mark.parametrize("copies", ["abc", 0, -2, 2.5, True, None, MAX_COPIES + 1, 1000000000])
+def test_copies_rejected(copies):
+    with pytest.raises(ValueError):
+        export_copies({"copies": copies})
+
+
+@pytest.mark.parametrize("url", ["/export/pdf", "/export/ai", "/export/bundle", "/export/pdf/1",
+                                 "/export/jobs"])
+@pytest.mark.parametrize("copies", ["abc", 1000000000])
+def test_export_rejects_bad_copies(client, url, copies):
+    resp = client.post(url, json=dict(LABEL, copies=copies))
+    assert resp.status_code == 400
+    assert "copies" in resp.json["error"]
+
+
+def test_export_repeats_copies(client):
+    resp = client.post("/export/pdf", json=dict(LABEL, copies="2"))
+    assert resp.status_code == 200
+    assert resp.data.count(b"/Type /Page\n") == 2
+
+
+@pytest.mark.parametrize("dpi, expected", [
+    (None, DEFAULT_IMAGE_DPI), (0, None), ("", None), ("150", 150),
+    (MIN_IMAGE_DPI, MIN_IMAGE_DPI), (MAX_IMAGE_DPI, MAX_IMAGE_DPI),
+])
+def test_dpi_parsed(dpi, expected):
+    data = {} if dpi is None else {"imageDpi": dpi}
+    assert export_dpi(data) == expected
+
+
+@pytest.mark.parametrize("dpi", ["x", -300, 10, 150.5, True, MAX_IMAGE_DPI + 1])
+def test_dpi_rejected(dpi):
+    with pytest.raises(ValueError):
+        export_dpi({"imageDpi": dpi})
+
+
+@pytest.mark.parametrize("url", ["/export/pdf", "/export/ai", "/export/bundle", "/export/pdf/1",
+                                 "/export/jobs"])
+@pytest.mark.parametrize("dpi", ["x", -300])
+def test_export_rejects_bad_dpi(client, url, dpi):
+    resp = client.post(url, json=dict(LABEL, imageDpi=dpi))
+    assert resp.status_code == 400
+    assert "imageDpi" in resp.json["error"]
@@ -0,0 +1,50 @@
+import base64
+import hashlib
+import io
+
+from PIL import Image
+
+from tools.assets import asset_path
+
+
+def _png_uri():
+    out = io.BytesIO()
+    Image.new("RGB", (8, 8), "green").save(out, "PNG")
+    data = out.getvalue()
+    return "data:image/png;base64," + base64.b64encode(data).decode(), hashlib.sha256(data).hexdigest()
+
+
+def _template(client):
+    cust = client.post("/api/customers", json={"company": "c", "domain": "c.test"}).json
+    tpl = client.post("/api/templates", json={
+        "customerId": cust["id"], "name": "t", "width": 30, "height": 50,
+        "orientation": "vertical"}).json
+    rows = client.put(f"/api/templates/{tpl['id']}/components", json={"components": [
+        {"type": "text", "content": "HELLO", "x": 1, "y": 1, "w": 20, "h": 5}]}).json
+    return tpl["id"], rows[0]["id"]
+
+
+def test_export_edit_does_not_store_images(client):
+    tid, cid = _template(client)
+    uri, sha = _png_uri()
+
+    resp = client.post(f"/export/pdf/{tid}", json={
+        "insert": [{"type": "image", "dataUri": uri, "x": 1, "y": 10, "w": 10, "h": 10}]})
+    assert resp.status_code == 200
+    assert b"/Subtype /Image" in resp.data
+    assert asset_path(sha) is None
+
+    resp = client.post(f"/export/pdf/{tid}", json={
+        "update": [{"id": cid, "type": "image", "dataUri": uri}]})
+    assert resp.status_code == 200
+    assert asset_path(sha) is None
+
+
+def test_saved_edit_stores_images(client):
+    tid, cid = _template(client)
+    uri, sha = _png_uri()
+
+    resp = client.patch(f"/api/templates/{tid}/components", json={
+        "insert": [{"type": "image", "dataUri": uri, "x": 1, "y": 10, "w": 10, "h": 10}]})
+    assert resp.status_code == 200
+    assert asset_path(sha) is not None
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+from PIL import Image
+
+from tools.image_cache import make_variant
+
+
+def _encode(mode, fmt, **kwargs):
+    out = io.BytesIO()
+    Image.new(mode, (400, 200), **kwargs).save(out, fmt)
+    return out.getvalue()
+
+
+def _variant(data):
+    return Image.open(io.BytesIO(make_variant(data, (100, 50))))
+
+
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+def test_png_variant_stays_lossless_png(mode):
+    im = _variant(_encode(mode, "PNG"))
+    assert (im.format, im.mode, im.size) == ("PNG", mode, (100, 50))
+
+
+def test_palette_variant_is_png():
+    im = _variant(_encode("P", "PNG"))
+    assert im.format == "PNG"
+
+
+def test_transparency_key_kept_as_alpha():
+    out = io.BytesIO()
+    Image.new("RGB", (400, 200), "white").save(out, "PNG", transparency=(255, 255, 255))
+    im = _variant(out.getvalue())
+    assert (im.format, im.mode) == ("PNG", "RGBA")
+
+
+@pytest.mark.parametrize("mode", ["CMYK", "RGB", "L"])
+def test_jpeg_variant_keeps_colour_mode(mode):
+    im = _variant(_encode(mode, "JPEG"))
+    assert (im.format, im.mode, im.size) == ("JPEG", mode, (100, 50))
@@ -0,0 +1,63 @@
+import base64
+import io
+import json
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from tools.assets import parse_ref, read_asset
+from tools.migrate import SCHEMA_PATH, SCHEMA_VERSION, migrate
+
+
+def _png():
+    out = io.BytesIO()
+    Image.new("RGB", (4, 4), "blue").save(out, "PNG")
+    return out.getvalue()
+
+
+def _old_db(version, bg_image):
+    """A database at an older schema version with one template row."""
+    conn = sqlite3.connect(":memory:")
+    with open(SCHEMA_PATH, "r") as f:
+        conn.executescript(f.read())
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.execute("INSERT INTO customers (id, company, domain) VALUES (1, 'c', 'c.test')")
+    conn.execute("INSERT INTO templates (id, customer_id, name, width, height, bg_image) "
+                 "VALUES (1, 1, 't', 30, 50, ?)", (bg_image,))
+    return conn
+
+
+def _bg_map(conn):
+    return json.loads(conn.execute("SELECT bg_image FROM templates WHERE id=1").fetchone()[0])
+
+
+@pytest.mark.usefixtures("asset_dir")
+def test_single_data_uri_background_becomes_page_map():
+    png = _png()
+    conn = _old_db(6, "data:image/png;base64," + base64.b64encode(png).decode())
+
+    migrate(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    pages = _bg_map(conn)
+    assert list(pages) == ["0"]
+    assert read_asset(parse_ref(pages["0"])) == png
+
+
+def test_plain_asset_url_background_becomes_page_map():
+    url = "/assets/" + "ab" * 32
+    conn = _old_db(8, url)
+
+    migrate(conn)
+
+    assert _bg_map(conn) == {"0": url}
+
+
+def test_page_map_background_unchanged():
+    value = json.dumps({"0": "/assets/" + "ab" * 32, "1": "/assets/" + "cd" * 32})
+    conn = _old_db(8, value)
+
+    migrate(conn)
+
+    assert conn.execute("SELECT bg_image FROM templates WHERE id=1").fetchone()[0] == value
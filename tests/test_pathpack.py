@@ -0,0 +1,46 @@
+import json
+
+from tools.pathpack import dump_path_data, load_path_data, pack_path
+
+PATH = {"ops": [{"o": "M", "a": [1.5, 2.25]}, {"o": "L", "a": [10.001, -3.0]},
+                {"o": "C", "a": [1, 2, 3, 4, 5, 6]}, {"o": "Z", "a": []}],
+        "fill": [0.1, 0.2, 0.3], "stroke": None, "lw": 0.2}
+
+
+def test_round_trip():
+    blob = dump_path_data(PATH)
+    assert isinstance(blob, bytes)
+    assert load_path_data(blob) == PATH
+
+
+def test_huge_coordinate_stored_as_json():
+    path = {"ops": [{"o": "M", "a": [0, 0]}, {"o": "L", "a": [1e7, 0]}]}
+    assert pack_path(path) is None
+    stored = dump_path_data(path)
+    assert json.loads(stored) == path
+    assert load_path_data(stored) == path
+
+
+def test_huge_delta_between_points_stored_as_json():
+    path = {"ops": [{"o": "M", "a": [-2e6, 0]}, {"o": "L", "a": [2e6, 0]}]}
+    assert pack_path(path) is None
+    assert load_path_data(dump_path_data(path)) == path
+
+
+def test_unknown_op_stored_as_json():
+    path = {"ops": [{"o": "Q", "a": [1, 2, 3, 4]}]}
+    assert load_path_data(dump_path_data(path)) == path
+
+
+def test_save_component_with_huge_coordinate(client):
+    cust = client.post("/api/customers", json={"company": "c", "domain": "c.test"}).json
+    tpl = client.post("/api/templates", json={
+        "customerId": cust["id"], "name": "t", "width": 30, "height": 50,
+        "orientation": "vertical"}).json
+    path = {"ops": [{"o": "M", "a": [0, 0]}, {"o": "L", "a": [1e7, 0]}]}
+    resp = client.put(f"/api/templates/{tpl['id']}/components", json={"components": [
+        {"type": "pdfpath", "x": 0, "y": 0, "w": 30, "h": 50, "pathData": path}]})
+    assert resp.status_code == 200
+
+    comps = client.get(f"/api/templates/{tpl['id']}/components").json
+    assert comps[0]["path_data"] == path
@@ -0,0 +1,20 @@
+import re
+
+import pytest
+
+# List endpoints and the tables they read, one query each
+LIST_QUERIES = {
+    "/api/customers": ["customers", "members"],
+    "/api/suppliers": ["suppliers", "members"],
+    "/api/templates": ["templates", "partitions", "components"],
+    "/api/templates?summary=1": ["templates", "partitions", "components"],
+    "/api/templates?limit=10": ["templates", "partitions", "components"],
+}
+
+
+@pytest.mark.parametrize("url, tables", LIST_QUERIES.items())
+@pytest.mark.parametrize("rows", [1, 25])
+def test_list_runs_one_query_per_table(seeded_db, traced_request, url, tables, rows):
+    status, statements = traced_request(seeded_db(rows), "GET", url)
+    assert status == 200
+    assert [re.search(r"\bFROM (\w+)", sql).group(1) for sql in statements] == tables
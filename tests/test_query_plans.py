@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+# Requests whose statements must all be served by an index
+PLAN_REQUESTS = [
+    ("GET", "/api/customers", None),
+    ("GET", "/api/suppliers", None),
+    ("GET", "/api/templates", None),
+    ("GET", "/api/templates?summary=1&limit=2&after=1", None),
+    ("GET", "/api/templates/2", None),
+    ("GET", "/api/templates/2/bg-image", None),
+    ("GET", "/api/templates/2/components", None),
+    ("PUT", "/api/templates/2/partitions",
+     {"partitions": [{"label": "A", "x": 0, "y": 0, "w": 10, "h": 10}]}),
+    ("PUT", "/api/templates/2/components",
+     {"components": [{"type": "text", "x": 0, "y": 0, "w": 10, "h": 5}]}),
+    ("PATCH", "/api/templates/2/components",
+     {"update": [{"id": 4, "content": "x"}], "delete": [5]}),
+    ("DELETE", "/api/members/1", None),
+    ("DELETE", "/api/templates/3", None),
+    ("DELETE", "/api/customers/4", None),
+    ("DELETE", "/api/suppliers/4", None),
+]
+
+
+def _plan_problems(conn, sql):
+    """Return the EXPLAIN QUERY PLAN lines of sql that do not use an index."""
+    problems = []
+    has_where = " WHERE " in sql.upper()
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        detail = row[-1]
+        if detail.startswith("USE TEMP B-TREE"):
+            problems.append(detail)
+        # A bare SCAN is a full table scan; fine only for whole-table listings
+        elif detail.startswith("SCAN ") and " USING " not in detail and has_where:
+            problems.append(detail)
+    return problems
+
+
+@pytest.mark.parametrize("method, url, body", PLAN_REQUESTS)
+def test_statements_use_an_index(seeded_db, traced_request, method, url, body):
+    db_path = seeded_db(25)
+    status, statements = traced_request(db_path, method, url, body)
+    assert status < 400
+
+    conn = sqlite3.connect(db_path)
+    problems = [
+        f"{problem} in {sql!r}"
+        for sql in statements
+        if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+        for problem in _plan_problems(conn, sql)
+    ]
+    conn.close()
+    assert not problems
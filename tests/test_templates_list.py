@@ -0,0 +1,42 @@
+import sqlite3
+
+import app as app_module
+
+TEMPLATES = 1200
+
+
+def _fill(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO customers (id, company, domain) VALUES (1, 'c', 'c.test')")
+    conn.executemany("INSERT INTO templates (id, customer_id, name, width, height) "
+                     "VALUES (?, 1, ?, 30, 50)", [(i, f"t{i}") for i in range(1, TEMPLATES + 1)])
+    conn.executemany("INSERT INTO partitions (template_id, label, x, y, w, h) "
+                     "VALUES (?, ?, 0, 0, 10, 10)", [(i, f"p{i}") for i in range(1, TEMPLATES + 1)])
+    conn.executemany("INSERT INTO components (template_id, type, content) VALUES (?, 'text', ?)",
+                     [(i, f"c{i}") for i in range(1, TEMPLATES + 1)])
+    conn.commit()
+    conn.close()
+
+
+def test_unpaginated_listing_beyond_variable_limit(client, monkeypatch):
+    _fill(app_module.DB_PATH)
+    connect = app_module._connect
+
+    def old_limit_connect():
+        conn = connect()
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        return conn
+
+    monkeypatch.setattr(app_module, "_connect", old_limit_connect)
+    monkeypatch.setattr(app_module._db_local, "conn", None, raising=False)
+
+    resp = client.get("/api/templates")
+    assert resp.status_code == 200
+    templates = resp.json
+    assert len(templates) == TEMPLATES
+    assert all(t["partitions"][0]["label"] == f"p{t['id']}" for t in templates)
+    assert all(t["components"][0]["content"] == f"c{t['id']}" for t in templates)
+
+    resp = client.get("/api/templates?summary=1")
+    assert resp.status_code == 200
+    assert all(t["partitionCount"] == 1 and t["componentCount"] == 1 for t in resp.json)
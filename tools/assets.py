@@ -0,0 +1,223 @@
+"""
+Content-addressed image asset store.
+
+Uploaded images are written once under their SHA-256 and referenced by
+URL ("/assets/<sha256>") instead of being inlined as base64 data URIs.
+The same image used by several templates is stored once. Exporters
+resolve either form through read_image(), so payloads and templates that
+still carry data URIs keep working.
+
+The store directory is set once at startup with set_asset_dir().
+"""
+
+import base64
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import tempfile
+
+ASSET_URL_PREFIX = "/assets/"
+
+# Files at least this large are read through mmap instead of read()
+MMAP_MIN_SIZE = 256 * 1024
+
+# Matches "/assets/<id>" as well as the absolute URL a browser reports
+# for it (img.src), with an optional query string
+_REF = re.compile(r"(?:^|/)assets/([0-9a-f]{64})(?:\?.*)?$")
+_ASSET_ID = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URI = re.compile(r"^data:([^;,]*)(;base64)?,", re.I)
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# Formats accepted for upload (PIL format name -> MIME type). Assets are
+# served from the app's own origin, so nothing that can carry script
+# (SVG, HTML) is accepted or served as such.
+UPLOAD_FORMATS = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+}
+
+_asset_dir = None
+
+
+def set_asset_dir(path):
+    """Set (and create) the directory assets are stored in."""
+    global _asset_dir
+    os.makedirs(path, exist_ok=True)
+    _asset_dir = path
+
+
+def _path(asset_id):
+    if _asset_dir is None:
+        raise RuntimeError("Asset directory not configured")
+    return os.path.join(_asset_dir, asset_id[:2], asset_id)
+
+
+def sniff_mime(data):
+    """
+    Return the MIME type of a PNG, JPEG, GIF or WebP image from its first
+    bytes, or application/octet-stream for anything else.
+    """
+    head = bytes(data[:16])
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and bytes(data[8:12]) == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def validate_image(data):
+    """
+    Return the MIME type of an uploaded image after checking it with PIL.
+
+    Raises ValueError unless data is a readable image in one of
+    UPLOAD_FORMATS.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format
+            img.verify()
+    except Exception as e:
+        raise ValueError(f"Not a valid image: {e}")
+    if fmt not in UPLOAD_FORMATS:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    return UPLOAD_FORMATS[fmt]
+
+
+def put_asset(data):
+    """Store bytes and return their asset id; existing content is not rewritten."""
+    asset_id = hashlib.sha256(data).hexdigest()
+    path = _path(asset_id)
+    if not os.path.exists(path):
+        write_file(path, data)
+    return asset_id
+
+
+def asset_path(asset_id):
+    """Return the file path of a stored asset, or None if it does not exist."""
+    if not _ASSET_ID.match(asset_id or ""):
+        return None
+    path = _path(asset_id)
+    return path if os.path.exists(path) else None
+
+
+def variant_path(key, tag):
+    """Return the on-disk path for a derived variant of an image (e.g. a resize)."""
+    if _asset_dir is None:
+        raise RuntimeError("Asset directory not configured")
+    return os.path.join(_asset_dir, "variants", key[:2], f"{key}-{tag}")
+
+
+def write_file(path, data):
+    """Write bytes to path atomically, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def asset_url(asset_id):
+    return ASSET_URL_PREFIX + asset_id
+
+
+def parse_ref(value):
+    """Return the asset id an image reference points to, or None."""
+    if not value or value.startswith("data:"):
+        return None
+    m = _REF.search(value)
+    return m.group(1) if m else None
+
+
+def read_asset(asset_id):
+    """
+    Return the bytes of a stored asset, or None if it does not exist.
+
+    Large files come back as a read-only mmap, which supports the buffer
+    protocol and slicing like bytes.
+    """
+    path = asset_path(asset_id)
+    if path is None:
+        return None
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_MIN_SIZE:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f.read()
+
+
+def read_image(ref):
+    """
+    Return image bytes for an asset URL or a data URI (None if unresolvable).
+    """
+    if not ref:
+        return None
+    asset_id = parse_ref(ref)
+    if asset_id:
+        return read_asset(asset_id)
+    m = _DATA_URI.match(ref)
+    if m is None:
+        return None
+    payload = ref[m.end():]
+    if m.group(2):
+        return base64.b64decode(payload)
+    return payload.encode("utf-8")
+
+
+def image_data_uri(ref):
+    """Return ref as a self-contained data URI (for SVG output)."""
+    if not ref or _DATA_URI.match(ref):
+        return ref
+    data = read_image(ref)
+    if data is None:
+        return ref
+    b64 = base64.b64encode(data).decode("ascii")
+    return f"data:{sniff_mime(data)};base64,{b64}"
+
+
+def store_data_uri(ref):
+    """
+    Move a base64 data URI into the store and return its asset URL.
+
+    Absolute asset URLs (as reported by img.src) are reduced to the
+    relative form; anything else is returned unchanged.
+    """
+    asset_id = parse_ref(ref)
+    if asset_id:
+        return asset_url(asset_id)
+    m = _DATA_URI.match(ref or "")
+    if m is None or not m.group(2):
+        return ref
+    return asset_url(put_asset(base64.b64decode(ref[m.end():])))
+
+
+def store_bg_images(value):
+    """
+    Replace data URIs in a templates.bg_image value with asset URLs.
+
+    The value is either a JSON map of page -> image or, from older
+    clients, a single image; a single image is stored as the map for page
+    0, which is the form the editor reads.
+    """
+    if not value:
+        return value
+    if value.startswith("{"):
+        try:
+            pages = json.loads(value)
+        except ValueError:
+            return value
+        return json.dumps({page: store_data_uri(ref) for page, ref in pages.items()})
+    return json.dumps({"0": store_data_uri(value)})
@@ -0,0 +1,126 @@
+"""
+Vector barcode and QR code geometry shared by the exporters.
+
+Symbols are generated with reportlab's own barcode widgets and reduced
+to the dark rectangles they draw, in the widget's own units (origin
+bottom-left). Each symbol also carries its PDF and SVG path data, built
+once. None of it depends on the printed size, so symbols are cached per
+(symbology, content): every label of a batch that repeats a code reuses
+the path, and the exporters only place it with a scaling transform.
+"""
+
+import threading
+from collections import OrderedDict
+
+from reportlab.graphics.barcode import createBarcodeDrawing
+from reportlab.graphics.shapes import Group, Rect
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+# Maximum number of symbols kept in memory
+BARCODE_CACHE_SIZE = 1024
+
+# Editor symbologies -> reportlab barcode name and options. No quiet
+# zone or border, matching the editor preview: the component box is the
+# symbol.
+SYMBOLOGIES = {
+    "code128": ("Code128", {"quiet": 0, "humanReadable": False}),
+    "qrcode": ("QR", {"barBorder": 0}),
+}
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _dark_rects(node, ox, oy, out):
+    for shape in node.contents:
+        if isinstance(shape, Group):
+            a, _, _, d, e, f = shape.transform
+            if a != 1 or d != 1:
+                raise ValueError("Unexpected scaled barcode group")
+            _dark_rects(shape, ox + e, oy + f, out)
+        elif isinstance(shape, Rect) and shape.fillColor is not None:
+            out.append((ox + shape.x, oy + shape.y, shape.width, shape.height))
+
+
+def _build(symbology, content):
+    name, options = SYMBOLOGIES[symbology]
+    drawing = createBarcodeDrawing(name, value=content, **options).expandUserNodes()
+    rects = []
+    _dark_rects(drawing, 0, 0, rects)
+    if not rects:
+        raise ValueError(f"Nothing to draw for {symbology} {content!r}")
+    pdf_path = PDFPathObject()
+    for rect in rects:
+        pdf_path.rect(*rect)
+    return {
+        "width": drawing.width,
+        "height": drawing.height,
+        "rects": tuple(rects),
+        "pdf_path": pdf_path,
+        "svg_path": " ".join(f"M{x:g} {y:g}h{w:g}v{h:g}h{-w:g}z" for x, y, w, h in rects),
+    }
+
+
+def get_symbol(symbology, content):
+    """
+    Return the shared symbol for a value, building it on first use.
+
+    Args:
+        symbology: key of SYMBOLOGIES ('code128' or 'qrcode')
+        content: value to encode
+
+    Returns:
+        dict with 'width' and 'height' (widget units), 'rects' (x, y,
+        width, height of each dark module), 'pdf_path' and 'svg_path'.
+        Raises KeyError for an unknown symbology and ValueError if the
+        content cannot be encoded.
+    """
+    key = (symbology, content)
+    with _lock:
+        symbol = _cache.get(key)
+        if symbol is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return symbol
+        _stats["misses"] += 1
+
+    symbol = _build(symbology, content)
+
+    with _lock:
+        _cache[key] = symbol
+        if len(_cache) > BARCODE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return symbol
+
+
+def draw_symbol(c, symbol, x, y, w, h):
+    """Fill a symbol scaled into the box at (x, y) (bottom-left, points) on a canvas."""
+    c.saveState()
+    c.transform(w / symbol["width"], 0, 0, h / symbol["height"], x, y)
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(symbol["pdf_path"], stroke=0, fill=1)
+    c.restoreState()
+
+
+def svg_transform(symbol, x, y, w, h):
+    """
+    Return the SVG transform placing a symbol's svg_path in the box at
+    (x, y) (top-left, SVG user units).
+    """
+    return "matrix(%g 0 0 %g %g %g)" % (
+        w / symbol["width"], -h / symbol["height"], x, y + h)
+
+
+def cache_stats():
+    """Return hit/miss counters and the current size of the barcode cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["symbols_cached"] = len(_cache)
+    stats["cache_size"] = BARCODE_CACHE_SIZE
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
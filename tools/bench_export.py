@@ -0,0 +1,88 @@
+"""
+Export timing benchmark.
+
+Renders a paragraph-heavy label (ten wrapped care-text paragraphs) in
+every export mode, including outlined text with glyph reuse, and prints
+the average time per label with the output size. Cold runs start with
+every font, glyph, layout and display-list cache emptied; warm runs
+reuse what the previous export left in them. Outlined modes need the
+system fonts; a font file can be given instead for machines that do not
+have them.
+
+Run from the project root:  python -m tools.bench_export [font.ttf]
+"""
+
+import io
+import sys
+import time
+
+from tools import (barcodes, display_list, font_cache, fonttools_outline, image_cache,
+                   render_plan, text_layout)
+from tools.export_ai import generate_ai
+from tools.export_pdf import generate_pdf
+from tools.export_svg import generate_svg
+
+CARE_TEXT = ("Machine wash cold 30C with like colours. Do not bleach. Tumble dry "
+             "low. Cool iron if needed. Do not dry clean. ")
+
+RUNS = 10
+
+
+def paragraph_label():
+    """Return export data for a 62 x 100 mm label of ten paragraphs."""
+    components = [
+        {"type": "paragraph", "content": CARE_TEXT * 5, "fontFamily": "Arial",
+         "fontSize": 5, "x": 1, "y": 1 + 9.8 * i, "width": 60, "height": 9.5}
+        for i in range(10)
+    ]
+    return {"label": {"width": 62, "height": 100}, "components": components}
+
+
+MODES = (
+    ("pdf", lambda data, out: generate_pdf(data, out)),
+    ("ai", lambda data, out: generate_ai(data, out)),
+    ("ai outlined", lambda data, out: generate_ai(data, out, outlined=True)),
+    ("svg", lambda data, out: generate_svg(data, out)),
+    ("svg outlined", lambda data, out: generate_svg(data, out, outlined=True)),
+    ("ai glyphs", lambda data, out: generate_ai(dict(data, glyphReuse=True), out, outlined=True)),
+    ("svg glyphs", lambda data, out: generate_svg(dict(data, glyphReuse=True), out, outlined=True)),
+)
+
+
+CACHES = (font_cache, fonttools_outline, text_layout, display_list, render_plan,
+          barcodes, image_cache)
+
+
+def clear_caches():
+    for cache in CACHES:
+        cache.clear_cache()
+
+
+def time_export(export, data, runs, cold):
+    """Return (average ms per label, output size) over runs exports."""
+    total = 0.0
+    for _ in range(runs):
+        if cold:
+            clear_caches()
+        out = io.BytesIO()
+        start = time.perf_counter()
+        export(data, out)
+        total += time.perf_counter() - start
+    return total / runs * 1000, len(out.getvalue())
+
+
+def run(runs=RUNS):
+    data = paragraph_label()
+    print(f"{'':14s} {'cold':>8s} {'warm':>8s}")
+    for name, export in MODES:
+        cold_ms, size = time_export(export, data, runs, cold=True)
+        # The last cold run leaves the caches filled for the warm runs
+        warm_ms, _ = time_export(export, data, runs, cold=False)
+        print(f"{name:14s} {cold_ms:8.1f} {warm_ms:8.1f} ms/label {size:10d} bytes")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        font_path = sys.argv[1]
+        font_cache.find_system_font = lambda font_family: font_path
+    run()
@@ -0,0 +1,186 @@
+"""
+Display list shared by the exporters.
+
+compile_label() resolves a label payload once into what every format
+draws: the label box, and one item per drawable component with its font
+resolved, its paragraph lines laid out and its barcode symbol built. The
+PDF, AI and SVG exporters are backends over the result (render_pdf(),
+render_ai(), render_svg()), so exporting one label in several formats or
+modes compiles it once. Compiled labels are cached by payload hash.
+
+Items are dicts. Every item has 'type' and its box 'x', 'y', 'w', 'h'
+in mm from the top-left of the label; by type:
+
+  text, paragraph   'family' (editor font family), 'font' (reportlab
+                    standard font), 'size' (pt), 'padding' (mm),
+                    'content' and 'lines'
+  image             'ref' (asset URL or data URI); pixels are decoded
+                    through tools.image_cache when first drawn
+  barcode, qrcode   'content' and 'symbol' (tools.barcodes, or None if
+                    the content cannot be encoded); a QR box is square
+  pdfpath           'pathData' and 'visible', as drawn by
+                    tools.path_engine.draw_pdfpath()
+
+Display lists are shared between exports and must not be modified.
+"""
+
+import threading
+from collections import OrderedDict
+
+from reportlab.lib.units import mm
+
+from tools.barcodes import get_symbol
+from tools.export_cache import export_key
+from tools.image_cache import export_dpi
+from tools.text_layout import pdf_font, wrap_text
+
+# Maximum number of compiled labels kept in memory
+DISPLAY_CACHE_SIZE = 64
+
+# Most copies of a label one export may repeat
+MAX_COPIES = 1000
+
+# Content drawn for empty barcode and QR components, as in the editor
+DEFAULT_CONTENT = {"barcode": "123456", "qrcode": "https://example.com"}
+_SYMBOLOGY = {"barcode": "code128", "qrcode": "qrcode"}
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def compile_label(data):
+    """
+    Return the display list for a label payload, compiling it on first use.
+
+    Returns:
+        dict with 'width' and 'height' (mm), 'background' (PDF
+        background image reference or None), 'image_dpi', 'glyph_reuse',
+        'copies' and 'items' (see the module docstring)
+    """
+    key = export_key(data, "display")
+    with _lock:
+        display = _cache.get(key)
+        if display is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return display
+        _stats["misses"] += 1
+
+    display = compile_page(data, data.get("components", []))
+
+    with _lock:
+        _cache[key] = display
+        if len(_cache) > DISPLAY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return display
+
+
+def compile_page(data, components):
+    """
+    Compile a payload with an explicit component list, without caching.
+
+    Batch exports use this for the static layer they split off.
+    """
+    label = data["label"]
+    return {
+        "width": label["width"],
+        "height": label["height"],
+        "background": data.get("pdfBackground") or None,
+        "image_dpi": export_dpi(data),
+        "glyph_reuse": bool(data.get("glyphReuse")),
+        "copies": export_copies(data),
+        "items": compile_items(components),
+    }
+
+
+def export_copies(data):
+    """
+    Return the copy count an export payload asks for (default 1).
+
+    Raises ValueError unless it is a whole number from 1 to MAX_COPIES.
+    """
+    copies = data.get("copies", 1)
+    if isinstance(copies, str) and copies.strip().isdigit():
+        copies = int(copies)
+    if isinstance(copies, bool) or not isinstance(copies, int) or not 1 <= copies <= MAX_COPIES:
+        raise ValueError(f"copies must be a whole number from 1 to {MAX_COPIES}")
+    return copies
+
+
+def with_options(display, options):
+    """
+    Return display with the export options in options ('imageDpi',
+    'copies', 'glyphReuse') applied; options it does not set are kept.
+    """
+    changed = {}
+    if "imageDpi" in options:
+        changed["image_dpi"] = export_dpi(options)
+    if "glyphReuse" in options:
+        changed["glyph_reuse"] = bool(options["glyphReuse"])
+    if "copies" in options:
+        changed["copies"] = export_copies(options)
+    return dict(display, **changed) if changed else display
+
+
+def compile_items(components):
+    """Compile components into display items, dropping unknown types."""
+    items = []
+    for comp in components:
+        item = _compile_item(comp)
+        if item is not None:
+            items.append(item)
+    return items
+
+
+def _compile_item(comp):
+    comp_type = comp.get("type", "")
+    item = {
+        "type": comp_type,
+        "x": comp.get("x", 0),
+        "y": comp.get("y", 0),
+        "w": comp.get("width", 0),
+        "h": comp.get("height", 0),
+    }
+    if comp_type in ("text", "paragraph"):
+        family = comp.get("fontFamily", "Arial")
+        font = pdf_font(family)
+        size = comp.get("fontSize", 8)
+        padding = comp.get("padding", 0)
+        content = comp.get("content", "")
+        if comp_type == "text":
+            lines = (content,)
+        else:
+            lines = wrap_text(content, font, size, item["w"] * mm - 2 * padding * mm)
+        item.update(family=family, font=font, size=size, padding=padding,
+                    content=content, lines=lines)
+    elif comp_type == "image":
+        item["ref"] = comp.get("dataUri", "")
+    elif comp_type in ("barcode", "qrcode"):
+        content = comp.get("content") or DEFAULT_CONTENT[comp_type]
+        try:
+            symbol = get_symbol(_SYMBOLOGY[comp_type], content)
+        except Exception:
+            symbol = None
+        if comp_type == "qrcode":
+            item["w"] = item["h"] = min(item["w"], item["h"])
+        item.update(content=content, symbol=symbol)
+    elif comp_type == "pdfpath":
+        item.update(pathData=comp.get("pathData", {}), visible=comp.get("visible", True))
+    else:
+        return None
+    return item
+
+
+def cache_stats():
+    """Return hit/miss counters and the current size of the display list cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["labels_cached"] = len(_cache)
+    stats["cache_size"] = DISPLAY_CACHE_SIZE
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
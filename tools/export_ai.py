@@ -6,16 +6,23 @@ Modern .ai format is PDF internally, so we generate a PDF and save as .ai.
 
 Two modes:
   - Editable: text remains as text objects (editable in Illustrator)
-  - Outlined: text converted to vector paths (not editable)
+  - Outlined: text converted to vector paths (not editable), or with
+    'glyphReuse' to references of one Form XObject per glyph
 """
 
-import base64
-import io
-import os
-import platform
+import zlib
+
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas as pdf_canvas
-from reportlab.lib.utils import ImageReader
+
+from tools.barcodes import draw_symbol
+from tools.display_list import compile_items, compile_label, compile_page
+from tools.image_cache import get_image
+from tools.path_engine import draw_pdfpath
+
+
+# Name of the Form XObject holding content shared by every page
+STATIC_FORM = "LabelStatic"
 
 
 def generate_ai(data, output_path, outlined=False):
@@ -23,81 +30,145 @@ def generate_ai(data, output_path, outlined=False):
     Generate a PDF-based .ai file from label designer data.
 
     Args:
-        data: dict with 'label' ({width, height} in mm) and 'components' list
-        output_path: file path for the output .ai file
+        data: dict with 'label' ({width, height} in mm) and 'components'
+            list; an optional 'copies' count repeats the label on that
+            many pages, all referencing one shared Form XObject; images
+            are embedded at 'imageDpi' for their printed size (default
+            300, 0 or null embeds the originals); with 'glyphReuse' set,
+            outlined text defines each distinct glyph once as a Form
+            XObject and places it by reference
+        output_path: file path or writable binary file object for the
+            output .ai file
+        outlined: if True, convert text to paths (non-editable)
+    """
+    render_ai(compile_label(data), output_path, outlined)
+
+
+def render_ai(display, output_path, outlined=False):
+    """Write a compiled display list (tools/display_list.py) as an .ai file."""
+    page_w = display["width"] * mm
+    page_h = display["height"] * mm
+
+    c = _new_canvas(output_path, page_w, page_h)
+    if display["copies"] == 1:
+        _draw_page(c, display, page_w, page_h, outlined)
+    else:
+        _draw_static_form(c, display, page_w, page_h, outlined)
+        for _ in range(display["copies"]):
+            c.doForm(STATIC_FORM)
+            c.showPage()
+    c.save()
+
+
+def generate_ai_batch(data, rows, output_path, outlined=False):
+    """
+    Generate a multi-page .ai file with one label per row of field values.
+
+    Everything that does not depend on row values is drawn once into a
+    Form XObject that each page references; only the variable components
+    are drawn per page, on top of the static layer.
+
+    Args:
+        data: label designer data as for generate_ai(); components take
+            row values through 'field' keys or '{{column}}' placeholders
+        rows: iterable of dicts mapping column names to values; consumed
+            lazily, one page at a time
+        output_path: file path or writable binary file object for the
+            output .ai file
         outlined: if True, convert text to paths (non-editable)
+
+    Returns:
+        number of pages written
     """
-    label = data["label"]
-    components = data.get("components", [])
+    from tools.variable_data import split_components
 
-    w_mm = label["width"]
-    h_mm = label["height"]
+    static, variable = split_components(data.get("components", []))
+    return render_ai_batch(compile_page(data, static), variable, rows, output_path, outlined)
 
-    page_w = w_mm * mm
-    page_h = h_mm * mm
 
-    # Separate components
+def render_ai_batch(display, variable, rows, output_path, outlined=False):
+    """
+    Write a batch .ai file from the compiled static layer of a label and
+    its variable components; arguments and result are as for
+    generate_ai_batch().
+    """
+    from tools.variable_data import iter_pages
+
+    page_w = display["width"] * mm
+    page_h = display["height"] * mm
+
+    c = _new_canvas(output_path, page_w, page_h, pageCompression=1)
+    _draw_static_form(c, display, page_w, page_h, outlined)
+    pages = 0
+    for components in iter_pages(variable, rows):
+        c.doForm(STATIC_FORM)
+        _draw_other_items(c, compile_items(components), page_h, outlined, display)
+        c.showPage()
+        pages += 1
+    if not pages:
+        raise ValueError("No rows provided")
+    c.save()
+    return pages
+
+
+def _draw_static_form(c, display, page_w, page_h, outlined):
+    """Compile a full label page into STATIC_FORM."""
+    c.beginForm(STATIC_FORM)
+    _draw_page(c, display, page_w, page_h, outlined)
+    c.endForm()
+
+
+def _new_canvas(output_path, page_w, page_h, **kwargs):
+    c = pdf_canvas.Canvas(output_path, pagesize=(page_w, page_h), **kwargs)
+    c.setCreator("Wash Care Label Designer")
+    c.setTitle("Wash Care Label")
+    return c
+
+
+def _draw_page(c, display, page_w, page_h, outlined):
+    """Draw one label page, keeping hidden paths at the bottom of the layers."""
+    # Separate items
     visible_paths = []
     hidden_paths = []
-    other_comps = []
-    for comp in components:
-        if comp.get("type") == "pdfpath":
-            if comp.get("visible", True):
-                visible_paths.append(comp)
+    other_items = []
+    for item in display["items"]:
+        if item["type"] == "pdfpath":
+            if item["visible"]:
+                visible_paths.append(item)
             else:
-                hidden_paths.append(comp)
+                hidden_paths.append(item)
         else:
-            other_comps.append(comp)
-
-    # If no hidden paths, simple single-pass export
-    if not hidden_paths:
-        c = pdf_canvas.Canvas(output_path, pagesize=(page_w, page_h))
-        c.setCreator("Wash Care Label Designer")
-        c.setTitle("Wash Care Label")
-        _draw_background(c, data, page_w, page_h)
-        _draw_border(c, page_w, page_h)
-        for comp in visible_paths:
-            _draw_pdfpath(c, comp, page_h)
-        _draw_other_comps(c, other_comps, page_h, outlined)
-        c.save()
-        return
+            other_items.append(item)
 
-    # Single page: hidden first (bottom in AI layers), separator, then visible (top)
-    # Illustrator reverses draw order: last drawn = top of Layers panel
-    c = pdf_canvas.Canvas(output_path, pagesize=(page_w, page_h))
-    c.setCreator("Wash Care Label Designer")
-    c.setTitle("Wash Care Label")
-    _draw_background(c, data, page_w, page_h)
+    _draw_background(c, display, page_w, page_h)
     _draw_border(c, page_w, page_h)
 
-    # Draw hidden paths first (will appear at bottom of Layers panel in AI)
-    for comp in hidden_paths:
-        _draw_pdfpath(c, comp, page_h)
+    if hidden_paths:
+        # Hidden first (bottom in AI layers), separator, then visible (top)
+        # Illustrator reverses draw order: last drawn = top of Layers panel
+        for item in hidden_paths:
+            draw_pdfpath(c, item, page_h)
 
-    # Separator line across the page (visible divider in Layers panel)
-    c.saveState()
-    c.setStrokeColorRGB(1, 0, 0)
-    c.setLineWidth(0.1)
-    c.line(0, page_h / 2, 0.01, page_h / 2)
-    c.restoreState()
+        # Separator line across the page (visible divider in Layers panel)
+        c.saveState()
+        c.setStrokeColorRGB(1, 0, 0)
+        c.setLineWidth(0.1)
+        c.line(0, page_h / 2, 0.01, page_h / 2)
+        c.restoreState()
 
     # Draw visible paths last (will appear at top of Layers panel in AI)
-    for comp in visible_paths:
-        _draw_pdfpath(c, comp, page_h)
+    for item in visible_paths:
+        draw_pdfpath(c, item, page_h)
 
-    # Draw other components
-    _draw_other_comps(c, other_comps, page_h, outlined)
-
-    c.save()
+    # Draw other items
+    _draw_other_items(c, other_items, page_h, outlined, display)
 
 
-def _draw_background(c, data, page_w, page_h):
-    pdf_bg = data.get("pdfBackground")
+def _draw_background(c, display, page_w, page_h):
+    pdf_bg = display["background"]
     if pdf_bg:
         try:
-            header, b64_data = pdf_bg.split(",", 1)
-            img_bytes = base64.b64decode(b64_data)
-            img = ImageReader(io.BytesIO(img_bytes))
+            img = get_image(pdf_bg, page_w, page_h, display["image_dpi"], fit=False)
             c.drawImage(img, 0, 0, width=page_w, height=page_h)
         except Exception:
             pass
@@ -109,327 +180,154 @@ def _draw_border(c, page_w, page_h):
     c.rect(0, 0, page_w, page_h)
 
 
-def _draw_other_comps(c, other_comps, page_h, outlined):
-    for comp in other_comps:
-        comp_type = comp.get("type", "")
-        x = comp.get("x", 0) * mm
-        y = page_h - comp.get("y", 0) * mm
-        w = comp.get("width", 0) * mm
-        h = comp.get("height", 0) * mm
-        if comp_type in ("text", "paragraph"):
+def _draw_other_items(c, items, page_h, outlined, display):
+    for item in items:
+        item_type = item["type"]
+        x = item["x"] * mm
+        y = page_h - item["y"] * mm
+        w = item["w"] * mm
+        h = item["h"] * mm
+        if item_type in ("text", "paragraph"):
             if outlined:
-                _draw_outlined_text(c, comp, x, y, w, h, page_h)
+                _draw_outlined_text(c, item, x, y, w, h, display["glyph_reuse"])
             else:
-                _draw_editable_text(c, comp, x, y, w, h)
-        elif comp_type == "image":
-            _draw_image(c, comp, x, y, w, h)
-        elif comp_type == "barcode":
-            _draw_barcode(c, comp, x, y, w, h)
-        elif comp_type == "qrcode":
-            _draw_qrcode(c, comp, x, y, w, h)
-
-
-def _draw_pdfpath(c, comp, page_h):
-    """Draw a vector path object extracted from a PDF."""
-    path_data = comp.get("pathData", {})
-    ops = path_data.get("ops", [])
-    fill = path_data.get("fill")
-    stroke = path_data.get("stroke")
-    lw = path_data.get("lw", 0.5)
-
-    if not ops:
-        return
+                _draw_editable_text(c, item, x, y, w, h)
+        elif item_type == "image":
+            _draw_image(c, item, x, y, w, h, display["image_dpi"])
+        elif item_type in ("barcode", "qrcode"):
+            _draw_symbol(c, item, x, y, w, h)
 
-    p = c.beginPath()
-    for op in ops:
-        o = op.get("o", "")
-        a = op.get("a", [])
-        if o == "M" and len(a) >= 2:
-            p.moveTo(a[0] * mm, page_h - a[1] * mm)
-        elif o == "L" and len(a) >= 2:
-            p.lineTo(a[0] * mm, page_h - a[1] * mm)
-        elif o == "C" and len(a) >= 6:
-            p.curveTo(a[0]*mm, page_h-a[1]*mm, a[2]*mm, page_h-a[3]*mm, a[4]*mm, page_h-a[5]*mm)
-        elif o == "Z":
-            p.close()
 
-    do_fill = 0
-    do_stroke = 0
-    if fill:
-        c.setFillColorRGB(fill[0], fill[1], fill[2])
-        do_fill = 1
-    if stroke:
-        c.setStrokeColorRGB(stroke[0], stroke[1], stroke[2])
-        c.setLineWidth(lw * mm)
-        do_stroke = 1
-
-    c.drawPath(p, fill=do_fill, stroke=do_stroke)
-
-
-# --- Font map ---
-_FONT_MAP = {
-    "Arial": "Helvetica",
-    "Helvetica": "Helvetica",
-    "Times New Roman": "Times-Roman",
-    "Courier New": "Courier",
-    "Georgia": "Times-Roman",
-    "Verdana": "Helvetica",
-}
-
-_SYSTEM_FONT_FILES = {
-    "Arial": "arial.ttf",
-    "Helvetica": "arial.ttf",
-    "Times New Roman": "times.ttf",
-    "Courier New": "cour.ttf",
-    "Georgia": "georgia.ttf",
-    "Verdana": "verdana.ttf",
-}
-
-
-def _draw_editable_text(c, comp, x, y, w, h):
+def _draw_editable_text(c, item, x, y, w, h):
     """Draw text as editable text objects."""
-    padding = comp.get("padding", 0) * mm
-    font_family = comp.get("fontFamily", "Helvetica")
-    font_size = comp.get("fontSize", 8)
-    content = comp.get("content", "")
+    padding = item["padding"] * mm
+    font_size = item["size"]
 
-    rl_font = _FONT_MAP.get(font_family, "Helvetica")
-    c.setFont(rl_font, font_size)
+    c.setFont(item["font"], font_size)
     c.setFillColorRGB(0, 0, 0)
 
     tx = x + padding
     ty = y - padding - font_size * 0.3528 * mm
-    available_w = w - 2 * padding
 
-    if comp.get("type") == "text":
-        c.drawString(tx, ty, content)
+    if item["type"] == "text":
+        c.drawString(tx, ty, item["content"])
     else:
-        lines = _wrap_text(c, content, rl_font, font_size, available_w)
         line_height = font_size * 1.3 * 0.3528 * mm
-        for i, line in enumerate(lines):
+        for i, line in enumerate(item["lines"]):
             line_y = ty - i * line_height
             if line_y < (y - h + padding):
                 break
             c.drawString(tx, line_y, line)
 
 
-def _draw_outlined_text(c, comp, x, y, w, h, page_h):
-    """Draw text as vector paths (outlined, non-editable)."""
-    padding = comp.get("padding", 0) * mm
-    font_family = comp.get("fontFamily", "Helvetica")
-    font_size = comp.get("fontSize", 8)
-    content = comp.get("content", "")
-
+def _draw_outlined_text(c, item, x, y, w, h, glyph_forms=False):
+    """
+    Draw text as vector paths (outlined, non-editable); with glyph_forms,
+    as references to one Form XObject per distinct glyph.
+    """
     try:
-        _draw_outlined_fonttools(c, comp, x, y, w, h, padding,
-                                  font_family, font_size, content)
+        _draw_outlined_fonttools(c, item, x, y, w, h, glyph_forms)
     except Exception:
         # Fallback to editable text if outline conversion fails
-        _draw_editable_text(c, comp, x, y, w, h)
-
+        _draw_editable_text(c, item, x, y, w, h)
 
-def _draw_outlined_fonttools(c, comp, x, y, w, h, padding,
-                              font_family, font_size, content):
-    """Convert text to PDF paths using fonttools glyph outlines."""
-    from fontTools.ttLib import TTFont
-    from fontTools.pens.recordingPen import RecordingPen
 
-    font_path = _find_system_font(font_family)
-    if not font_path:
-        raise FileNotFoundError(f"Font not found: {font_family}")
+def _draw_outlined_fonttools(c, item, x, y, w, h, glyph_forms=False):
+    """Convert text to PDF paths using cached fonttools glyph outlines."""
+    from tools.font_cache import get_font, glyph_outline
 
-    font = TTFont(font_path)
-    glyph_set = font.getGlyphSet()
-    cmap = font.getBestCmap()
-    units_per_em = font["head"].unitsPerEm
+    font = get_font(item["family"])
+    padding = item["padding"] * mm
+    font_size = item["size"]
 
     # Scale: font units to points, then to mm for reportlab
-    scale = font_size / units_per_em  # font units -> pt
-    pt2mm = 0.3528 * mm               # pt -> reportlab units (mm)
+    scale = font_size / font["units_per_em"]  # font units -> pt
+    pt2mm = 0.3528 * mm                        # pt -> reportlab units (mm)
 
     tx = x + padding
     ty = y - padding - font_size * pt2mm
-    available_w = w - 2 * padding
-
-    if comp.get("type") == "text":
-        lines = [content]
-    else:
-        rl_font = _FONT_MAP.get(font_family, "Helvetica")
-        c.setFont(rl_font, font_size)
-        lines = _wrap_text(c, content, rl_font, font_size, available_w)
 
     line_height = font_size * 1.3 * pt2mm
+    k = scale * pt2mm
 
     c.setFillColorRGB(0, 0, 0)
 
-    for i, line in enumerate(lines):
+    for i, line in enumerate(item["lines"]):
         line_y = ty - i * line_height
         if line_y < (y - h + padding):
             break
         cursor_x = tx
         for char in line:
-            code = ord(char)
-            glyph_name = cmap.get(code)
-            if not glyph_name:
+            outline = glyph_outline(font, char)
+            if outline is None:
                 cursor_x += font_size * 0.3
                 continue
 
-            glyph = glyph_set[glyph_name]
-            pen = RecordingPen()
-            glyph.draw(pen)
-
-            # Transform helper: font units -> absolute position
-            def fx(val):
-                return cursor_x + val * scale * pt2mm
-
-            def fy(val):
-                return line_y + val * scale * pt2mm
-
-            # Draw glyph as PDF path with proper curve conversion
-            p = c.beginPath()
-            cur_x, cur_y = 0.0, 0.0  # track current point in font units
-
-            for op, args in pen.value:
-                if op == "moveTo":
-                    cur_x, cur_y = args[0]
-                    p.moveTo(fx(cur_x), fy(cur_y))
-
-                elif op == "lineTo":
-                    cur_x, cur_y = args[0]
-                    p.lineTo(fx(cur_x), fy(cur_y))
-
-                elif op == "curveTo":
-                    # Already cubic bezier — 3 points (cp1, cp2, end)
-                    p.curveTo(
-                        fx(args[0][0]), fy(args[0][1]),
-                        fx(args[1][0]), fy(args[1][1]),
-                        fx(args[2][0]), fy(args[2][1]),
-                    )
-                    cur_x, cur_y = args[2]
-
-                elif op == "qCurveTo":
-                    # TrueType quadratic B-spline: may have multiple
-                    # off-curve points with implied on-curve midpoints.
-                    # Decompose into individual quadratic segments,
-                    # then convert each to cubic bezier.
-                    off_curves = list(args[:-1])
-                    on_curve = args[-1]
-
-                    # If on_curve is None, the contour is closed with
-                    # an implied point between last and first off-curve
-                    if on_curve is None and len(off_curves) >= 2:
-                        # Implied start = midpoint of last and first off-curve
-                        mid_x = (off_curves[-1][0] + off_curves[0][0]) / 2
-                        mid_y = (off_curves[-1][1] + off_curves[0][1]) / 2
-                        on_curve = (mid_x, mid_y)
-
-                    # Build list of on-curve points between consecutive
-                    # off-curve points (implied midpoints)
-                    points = []  # list of (on_curve, off_curve, on_curve) segments
-                    p0 = (cur_x, cur_y)
-
-                    for j, off in enumerate(off_curves):
-                        if j < len(off_curves) - 1:
-                            # Implied on-curve midpoint between this and next off-curve
-                            next_off = off_curves[j + 1]
-                            mid = ((off[0] + next_off[0]) / 2,
-                                   (off[1] + next_off[1]) / 2)
-                            points.append((p0, off, mid))
-                            p0 = mid
-                        else:
-                            # Last off-curve to final on-curve
-                            points.append((p0, off, on_curve))
-
-                    # Convert each quadratic segment to cubic and draw
-                    for p0_pt, p1_pt, p2_pt in points:
-                        # Quadratic to cubic conversion:
-                        # CP1 = P0 + 2/3 * (P1 - P0)
-                        # CP2 = P2 + 2/3 * (P1 - P2)
-                        cp1x = p0_pt[0] + 2/3 * (p1_pt[0] - p0_pt[0])
-                        cp1y = p0_pt[1] + 2/3 * (p1_pt[1] - p0_pt[1])
-                        cp2x = p2_pt[0] + 2/3 * (p1_pt[0] - p2_pt[0])
-                        cp2y = p2_pt[1] + 2/3 * (p1_pt[1] - p2_pt[1])
-
-                        p.curveTo(
-                            fx(cp1x), fy(cp1y),
-                            fx(cp2x), fy(cp2y),
-                            fx(p2_pt[0]), fy(p2_pt[1]),
-                        )
-
-                    if on_curve is not None:
-                        cur_x, cur_y = on_curve
-
-                elif op == "closePath":
-                    p.close()
-                elif op == "endPath":
-                    pass
-
-            c.drawPath(p, fill=1, stroke=0)
+            segments, advance = outline
+            if segments and glyph_forms:
+                c.saveState()
+                c.transform(k, 0, 0, k, cursor_x, line_y)
+                c.doForm(_glyph_form(c, font, char, segments))
+                c.restoreState()
+            elif segments:
+                # Segments are cubic and in font units: scale and translate
+                c.drawPath(_glyph_path(c, segments, k, cursor_x, line_y), fill=1, stroke=0)
 
             # Advance cursor
-            if hasattr(glyph, "width"):
-                cursor_x += glyph.width * scale * pt2mm
+            if advance is not None:
+                cursor_x += advance * k
             else:
                 cursor_x += font_size * 0.3
 
-    font.close()
-
-
-def _find_system_font(font_family):
-    """Locate a system font file."""
-    filename = _SYSTEM_FONT_FILES.get(font_family, "arial.ttf")
 
-    if platform.system() == "Windows":
-        font_dir = os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts")
-    elif platform.system() == "Darwin":
-        font_dir = "/Library/Fonts"
-    else:
-        font_dir = "/usr/share/fonts/truetype"
-
-    path = os.path.join(font_dir, filename)
-    if os.path.exists(path):
-        return path
-
-    if platform.system() == "Windows" and os.path.isdir(font_dir):
-        lower = filename.lower()
-        for f in os.listdir(font_dir):
-            if f.lower() == lower:
-                return os.path.join(font_dir, f)
-
-    return None
-
-
-def _wrap_text(c, text, font, size, max_width):
-    """Word-wrap text to fit within max_width."""
-    words = text.split()
-    lines = []
-    current_line = ""
-
-    for word in words:
-        test = (current_line + " " + word).strip()
-        if c.stringWidth(test, font, size) <= max_width:
-            current_line = test
+def _glyph_path(c, segments, k, tx, ty):
+    """Build a path from cubic segments in font units, scaled by k and moved to (tx, ty)."""
+    p = c.beginPath()
+    for seg in segments:
+        op = seg[0]
+        if op == "M":
+            p.moveTo(tx + seg[1] * k, ty + seg[2] * k)
+        elif op == "L":
+            p.lineTo(tx + seg[1] * k, ty + seg[2] * k)
+        elif op == "C":
+            p.curveTo(
+                tx + seg[1] * k, ty + seg[2] * k,
+                tx + seg[3] * k, ty + seg[4] * k,
+                tx + seg[5] * k, ty + seg[6] * k,
+            )
         else:
-            if current_line:
-                lines.append(current_line)
-            current_line = word
+            p.close()
+    return p
 
-    if current_line:
-        lines.append(current_line)
 
-    return lines
+def _glyph_form(c, font, char, segments):
+    """
+    Return the name of the Form XObject holding a glyph in font units,
+    defining it in the document on first use.
+    """
+    name = "Glyph%08X_%X" % (zlib.crc32(font["path"].encode("utf-8")), ord(char))
+    if not c.hasForm(name):
+        xs = [v for seg in segments for v in seg[1::2]]
+        ys = [v for seg in segments for v in seg[2::2]]
+        c.beginForm(name, min(xs), min(ys), max(xs), max(ys))
+        c.drawPath(_glyph_path(c, segments, 1, 0, 0), fill=1, stroke=0)
+        c.endForm()
+    return name
 
 
-def _draw_image(c, comp, x, y, w, h):
-    """Draw an image component from a data URI."""
-    data_uri = comp.get("dataUri", "")
+def _draw_image(c, item, x, y, w, h, image_dpi=None):
+    """
+    Draw an image item from an asset URL or data URI, downsampled to
+    image_dpi for its printed size (None embeds the original).
+    """
+    data_uri = item["ref"]
     if not data_uri:
         return
 
     try:
-        header, b64_data = data_uri.split(",", 1)
-        img_bytes = base64.b64decode(b64_data)
-        img = ImageReader(io.BytesIO(img_bytes))
+        img = get_image(data_uri, w, h, image_dpi)
+        if img is None:
+            raise ValueError("Image not found")
         img_y = y - h
         c.drawImage(img, x, img_y, width=w, height=h,
                      preserveAspectRatio=True, anchor="nw")
@@ -440,43 +338,13 @@ def _draw_image(c, comp, x, y, w, h):
         c.drawString(x + 1 * mm, y - h / 2, "[image]")
 
 
-def _draw_barcode(c, comp, x, y, w, h):
-    """Render barcode using python-barcode."""
-    content = comp.get("content", "123456")
-    try:
-        import barcode as barcode_lib
-        from barcode.writer import ImageWriter
-        code = barcode_lib.get("code128", content, writer=ImageWriter())
-        buf = io.BytesIO()
-        code.write(buf, options={"write_text": False, "module_width": 0.2,
-                                  "module_height": float(h / mm * 0.8)})
-        buf.seek(0)
-        img = ImageReader(buf)
-        c.drawImage(img, x, y - h, width=w, height=h, preserveAspectRatio=True)
-    except Exception:
-        c.setStrokeColorRGB(0, 0, 0)
-        c.setLineWidth(0.25)
-        c.rect(x, y - h, w, h)
-        c.setFont("Helvetica", 6)
-        c.drawString(x + 1 * mm, y - h / 2, "[barcode]")
-
-
-def _draw_qrcode(c, comp, x, y, w, h):
-    """Render QR code using qrcode package."""
-    content = comp.get("content", "https://example.com")
-    try:
-        import qrcode
-        qr = qrcode.make(content, box_size=10, border=0)
-        buf = io.BytesIO()
-        qr.save(buf, format="PNG")
-        buf.seek(0)
-        img = ImageReader(buf)
-        size = min(w, h)
-        c.drawImage(img, x, y - size, width=size, height=size, preserveAspectRatio=True)
-    except Exception:
-        c.setStrokeColorRGB(0, 0, 0)
-        c.setLineWidth(0.25)
-        size = min(w, h)
-        c.rect(x, y - size, size, size)
-        c.setFont("Helvetica", 6)
-        c.drawString(x + 1 * mm, y - size / 2, "[qr]")
+def _draw_symbol(c, item, x, y, w, h):
+    """Draw a barcode or QR code item as vector modules filling its box."""
+    if item["symbol"] is not None:
+        draw_symbol(c, item["symbol"], x, y - h, w, h)
+        return
+    c.setStrokeColorRGB(0, 0, 0)
+    c.setLineWidth(0.25)
+    c.rect(x, y - h, w, h)
+    c.setFont("Helvetica", 6)
+    c.drawString(x + 1 * mm, y - h / 2, "[qr]" if item["type"] == "qrcode" else "[barcode]")
@@ -0,0 +1,179 @@
+"""
+Content-addressed cache for rendered exports.
+
+Entries are keyed by a SHA-256 of the canonical JSON export payload plus
+the export mode (e.g. "pdf", "ai-outlined") and RENDER_VERSION. Recent results are held in a
+bounded in-memory LRU; every result is also written to a directory on
+disk, which is trimmed oldest-first once it grows past its size limit.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+# Part of every cache key and ETag. Bump it whenever exporter output
+# changes, so results cached on disk or by clients are not served for
+# payloads that now render differently.
+RENDER_VERSION = 2
+
+
+def export_key(data, mode):
+    """Return the cache key (hex SHA-256) for an export payload and mode."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False)
+    h = hashlib.sha256()
+    h.update(f"{RENDER_VERSION}:{mode}".encode("utf-8"))
+    h.update(b"\0")
+    h.update(canonical.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ExportCache:
+    """Two-tier (memory + disk) cache of rendered export files."""
+
+    def __init__(self, cache_dir, memory_limit=32 * 1024 * 1024,
+                 memory_entry_limit=2 * 1024 * 1024,
+                 disk_limit=256 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: directory for the on-disk tier (created if missing)
+            memory_limit: total bytes kept in the in-memory tier
+            memory_entry_limit: larger results are only kept on disk
+            disk_limit: total bytes kept on disk before eviction
+        """
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.memory_entry_limit = memory_entry_limit
+        self.disk_limit = disk_limit
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = sum(
+            os.path.getsize(os.path.join(cache_dir, f))
+            for f in os.listdir(cache_dir) if not f.endswith(".tmp")
+        )
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def open(self, key):
+        """Return a readable binary file object for a cached key, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return io.BytesIO(data)
+
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        # Touch so disk eviction drops least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        size = os.fstat(f.fileno()).st_size
+        with self._lock:
+            self._stats["disk_hits"] += 1
+        if size <= self.memory_entry_limit:
+            data = f.read()
+            f.close()
+            self._remember(key, data)
+            return io.BytesIO(data)
+        return f
+
+    def put(self, key, fileobj):
+        """Store the contents of a seekable binary file object under key."""
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(0)
+
+        if size <= self.memory_entry_limit:
+            self._remember(key, fileobj.read())
+            fileobj.seek(0)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                shutil.copyfileobj(fileobj, out)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort; the memory tier still has it
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        finally:
+            fileobj.seek(0)
+
+        with self._lock:
+            self._disk_bytes += size - replaced
+            over = self._disk_bytes > self.disk_limit
+        if over:
+            self._evict_disk()
+
+    def _remember(self, key, data):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_limit and self._memory:
+                _, dropped = self._memory.popitem(last=False)
+                self._memory_bytes -= len(dropped)
+
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier fits."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(e[1] for e in entries)
+        # Trim to 90% of the limit so eviction does not run on every put
+        target = self.disk_limit * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["disk_bytes"] = self._disk_bytes
+        return stats
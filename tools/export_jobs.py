@@ -0,0 +1,349 @@
+"""
+Asynchronous export jobs.
+
+Long exports (outlined AI, large batches) run in a bounded pool of
+worker processes instead of a web worker thread. Each job has a
+directory under the jobs directory holding its input, a status.json the
+worker updates with its state and progress, and finally its result.
+Finished jobs are kept for a time-to-live and then removed.
+
+Submissions are refused with JobRejected once as many jobs are queued or
+running as the queue allows (status 429), or if the worker pool cannot
+take work (status 503); both carry a suggested retry delay.
+
+Job states: queued, running, done, failed, cancelled. Batch jobs report
+the pages written so far. A queued job is cancelled at once; a running
+batch stops at its next progress check, and a single export is
+discarded when it finishes.
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Seconds between progress updates written by a running job
+PROGRESS_INTERVAL = 0.5
+# Retry delay suggested before any job has finished
+DEFAULT_RETRY_AFTER = 5
+# Seconds between sweeps for expired job directories
+SWEEP_INTERVAL = 60
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+
+class JobRejected(Exception):
+    """A job was not admitted; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class ExportJobs:
+    """Export job queue backed by a process pool."""
+
+    def __init__(self, jobs_dir, asset_dir, workers=2, queue_limit=8, ttl=3600):
+        """
+        Args:
+            jobs_dir: directory for job inputs, status and results
+                (created if missing)
+            asset_dir: asset store directory for the worker processes
+            workers: number of worker processes
+            queue_limit: jobs queued or running before submissions are
+                refused
+            ttl: seconds a finished job and its result are kept
+        """
+        self.jobs_dir = jobs_dir
+        self.asset_dir = asset_dir
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.ttl = ttl
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        self._pool = None
+        self._futures = {}  # job id -> Future, while queued or running
+        self._durations = []  # seconds taken by recently finished jobs
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "cancelled": 0}
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, fmt, data, download_name, rows=None, rows_fmt=None):
+        """
+        Queue an export job and return its id.
+
+        Args:
+            fmt: export format ("pdf", "ai", "ai-outlined", "svg",
+                "svg-outlined"; only "pdf", "ai" and "ai-outlined" with rows)
+            data: export payload
+            download_name: file name the result is served under
+            rows: binary file object of batch rows; makes this a batch
+                job, one page per row
+            rows_fmt: format of rows ("csv" or "ndjson")
+
+        Raises:
+            JobRejected: the queue is full or the pool is unavailable
+        """
+        self.sweep()
+        with self._lock:
+            pending = len(self._futures)
+            if pending >= self.queue_limit:
+                self._stats["rejected"] += 1
+                raise JobRejected("Export queue is full", 429, self._retry_after(pending))
+
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        if rows is not None:
+            with open(os.path.join(job_dir, "rows"), "wb") as f:
+                shutil.copyfileobj(rows, f)
+        _write_status(job_dir, {
+            "id": job_id, "format": fmt, "batch": rows is not None,
+            "downloadName": download_name, "state": "queued",
+            "created": time.time(), **({"pages": 0} if rows is not None else {}),
+        })
+
+        with self._lock:
+            try:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker, initargs=(self.asset_dir,))
+                future = self._pool.submit(_run_job, job_dir, fmt, data, rows_fmt)
+            except (BrokenProcessPool, RuntimeError, OSError) as e:
+                # Start a fresh pool on the next submission
+                self._pool = None
+                self._stats["rejected"] += 1
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise JobRejected(f"Export workers unavailable: {e}", 503, DEFAULT_RETRY_AFTER)
+            self._futures[job_id] = future
+            self._stats["submitted"] += 1
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+        return job_id
+
+    def _finished(self, job_id, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            state, took = "cancelled", None
+        else:
+            try:
+                state, took = future.result()
+            except Exception as e:
+                # The worker died before it could record the failure
+                _update_status(self._job_dir(job_id), state="failed", error=str(e),
+                               finished=time.time())
+                state, took = "failed", None
+        with self._lock:
+            self._stats[state] += 1
+            if took is not None:
+                self._durations = (self._durations + [took])[-20:]
+
+    def _retry_after(self, pending):
+        """Estimate seconds until a queue slot frees up (lock held)."""
+        if not self._durations:
+            return DEFAULT_RETRY_AFTER
+        average = sum(self._durations) / len(self._durations)
+        ahead = pending - self.queue_limit + 1
+        return max(1, math.ceil(average * ahead / self.workers))
+
+    def status(self, job_id):
+        """Return the status dict of a job, or None if it is unknown or expired."""
+        if not _valid_id(job_id):
+            return None
+        return _read_status(self._job_dir(job_id))
+
+    def result(self, job_id):
+        """Return (path, download name) of a finished job's result, or None."""
+        status = self.status(job_id)
+        if status is None or status["state"] != "done":
+            return None
+        return os.path.join(self._job_dir(job_id), "result"), status["downloadName"]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; return its status, or None if unknown."""
+        status = self.status(job_id)
+        if status is None or status["state"] in FINISHED_STATES:
+            return status
+        job_dir = self._job_dir(job_id)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return _update_status(job_dir, state="cancelled", finished=time.time())
+        # Running (or owned by another server process): ask the worker to stop
+        open(os.path.join(job_dir, "cancel"), "w").close()
+        return dict(status, cancelRequested=True)
+
+    def sweep(self, force=False):
+        """
+        Remove jobs whose status has not changed for the TTL; runs at most
+        every SWEEP_INTERVAL. Finished jobs last change when they finish;
+        unfinished ones that old were lost with a previous server process.
+        """
+        now = time.time()
+        if not force and now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        with self._lock:
+            active = set(self._futures)
+        for job_id in os.listdir(self.jobs_dir):
+            if job_id in active:
+                continue
+            job_dir = self._job_dir(job_id)
+            try:
+                changed = os.path.getmtime(os.path.join(job_dir, "status.json"))
+            except OSError:
+                changed = os.path.getmtime(job_dir)
+            if now - changed > self.ttl:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def stats(self):
+        """Return job counters and the current queue depth."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._futures)
+        stats["workers"] = self.workers
+        stats["queue_limit"] = self.queue_limit
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _valid_id(job_id):
+    return len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+def _read_status(job_dir):
+    try:
+        with open(os.path.join(job_dir, "status.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_status(job_dir, status):
+    path = os.path.join(job_dir, "status.json")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+    return status
+
+
+def _update_status(job_dir, **changes):
+    status = _read_status(job_dir) or {}
+    status.update(changes)
+    return _write_status(job_dir, status)
+
+
+# Worker process side
+
+def _init_worker(asset_dir):
+    from tools.assets import set_asset_dir
+    set_asset_dir(asset_dir)
+
+
+class _Progress:
+    """Progress reporting and cancellation checks of a running job."""
+
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self._cancel_path = os.path.join(job_dir, "cancel")
+        self._last = 0
+
+    def check(self):
+        if os.path.exists(self._cancel_path):
+            raise _Cancelled()
+
+    def pages(self, pages):
+        """Record the number of pages written, at most every PROGRESS_INTERVAL."""
+        now = time.monotonic()
+        if now - self._last >= PROGRESS_INTERVAL:
+            self._last = now
+            self.check()
+            _update_status(self.job_dir, pages=pages)
+
+    def rows(self, rows):
+        """Yield rows, reporting progress as each page starts."""
+        for n, row in enumerate(rows):
+            self.pages(n)
+            yield row
+
+
+def _run_job(job_dir, fmt, data, rows_fmt):
+    """Run one job in a worker process; returns (final state, seconds taken)."""
+    start = time.time()
+    progress = _Progress(job_dir)
+    result_path = os.path.join(job_dir, "result")
+    try:
+        progress.check()
+        _update_status(job_dir, state="running", started=start)
+        with open(result_path + ".part", "wb") as out:
+            if rows_fmt is None:
+                _render(fmt, data, out)
+                done = {}
+            else:
+                done = {"pages": _render_batch(fmt, data, rows_fmt, out, progress)}
+        progress.check()
+        os.replace(result_path + ".part", result_path)
+    except _Cancelled:
+        _update_status(job_dir, state="cancelled", finished=time.time())
+        return "cancelled", None
+    except Exception as e:
+        _update_status(job_dir, state="failed", error=str(e), finished=time.time())
+        return "failed", None
+    finally:
+        if os.path.exists(result_path + ".part"):
+            os.remove(result_path + ".part")
+    finished = time.time()
+    _update_status(job_dir, state="done", finished=finished,
+                   size=os.path.getsize(result_path), **done)
+    return "done", finished - start
+
+
+def _render(fmt, data, out):
+    if fmt == "pdf":
+        from tools.export_pdf import generate_pdf
+        generate_pdf(data, out)
+    elif fmt in ("ai", "ai-outlined"):
+        from tools.export_ai import generate_ai
+        generate_ai(data, out, outlined=fmt == "ai-outlined")
+    elif fmt in ("svg", "svg-outlined"):
+        from tools.export_svg import generate_svg
+        generate_svg(data, out, outlined=fmt == "svg-outlined")
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _render_batch(fmt, data, rows_fmt, out, progress):
+    import io
+
+    from tools.variable_data import iter_rows
+
+    with open(os.path.join(progress.job_dir, "rows"), "rb") as f:
+        rows = progress.rows(iter_rows(
+            io.TextIOWrapper(f, encoding="utf-8-sig", newline=""), rows_fmt))
+        if fmt == "pdf":
+            from tools.export_pdf import generate_pdf_batch
+            return generate_pdf_batch(data, rows, out)
+        from tools.export_ai import generate_ai_batch
+        return generate_ai_batch(data, rows, out, outlined=fmt == "ai-outlined")
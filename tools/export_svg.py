@@ -4,13 +4,18 @@ SVG Export Tool for Wash Care Label Designer.
 Generates SVG files compatible with Adobe Illustrator.
 Supports two modes:
   - Editable (not outlined): text remains as <text> elements
-  - Outlined: text converted to <path> elements using fonttools
+  - Outlined: text converted to <path> elements using fonttools, or
+    with 'glyphReuse' to <use> references of one path per glyph
 """
 
-import base64
 import os
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom.minidom import parseString
+from xml.etree.ElementTree import Element, SubElement, indent, tostring
+
+from reportlab.lib.units import mm
+
+from tools.barcodes import svg_transform
+from tools.display_list import compile_label
+from tools.image_cache import get_data_uri
 
 
 def generate_svg(data, output_path, outlined=False):
@@ -18,15 +23,21 @@ def generate_svg(data, output_path, outlined=False):
     Generate an SVG from label designer data.
 
     Args:
-        data: dict with 'label' ({width, height} in mm) and 'components' list
-        output_path: file path for the output SVG
+        data: dict with 'label' ({width, height} in mm) and 'components'
+            list; images are embedded at 'imageDpi' as for generate_pdf();
+            with 'glyphReuse' set, outlined text defines each distinct
+            glyph once in <defs> and places it with <use>
+        output_path: file path or writable binary file object for the
+            output SVG
         outlined: if True, convert text to paths
     """
-    label = data["label"]
-    components = data.get("components", [])
+    render_svg(compile_label(data), output_path, outlined)
 
-    w_mm = label["width"]
-    h_mm = label["height"]
+
+def render_svg(display, output_path, outlined=False):
+    """Write a compiled display list (tools/display_list.py) as an SVG."""
+    w_mm = display["width"]
+    h_mm = display["height"]
 
     # SVG root with mm units
     svg = Element("svg")
@@ -47,47 +58,48 @@ def generate_svg(data, output_path, outlined=False):
     bg.set("stroke", "black")
     bg.set("stroke-width", "0.1")
 
-    for comp in components:
-        comp_type = comp.get("type", "")
-        if comp_type in ("text", "paragraph"):
+    # Outlined glyphs already defined: key -> id, under one <defs>
+    glyphs = None
+    if outlined and display["glyph_reuse"]:
+        glyphs = {"defs": SubElement(svg, "defs"), "ids": {}}
+
+    for item in display["items"]:
+        item_type = item["type"]
+        if item_type in ("text", "paragraph"):
             if outlined:
-                _add_outlined_text(svg, comp)
+                _add_outlined_text(svg, item, glyphs)
             else:
-                _add_editable_text(svg, comp)
-        elif comp_type == "image":
-            _add_image(svg, comp)
-
-    # Write SVG
-    raw_xml = tostring(svg, encoding="unicode")
-    pretty = parseString(raw_xml).toprettyxml(indent="  ")
-    # Remove extra xml declaration if present
-    lines = pretty.split("\n")
-    if lines[0].startswith("<?xml"):
-        lines[0] = '<?xml version="1.0" encoding="UTF-8"?>'
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+                _add_editable_text(svg, item)
+        elif item_type == "image":
+            _add_image(svg, item, display["image_dpi"])
+        elif item_type in ("barcode", "qrcode"):
+            _add_barcode(svg, item)
+
+    # Write SVG; indent in place rather than re-parsing the output to
+    # pretty-print it
+    indent(svg, space="  ")
+    svg_text = '<?xml version="1.0" encoding="UTF-8"?>\n' + tostring(svg, encoding="unicode") + "\n"
+    if hasattr(output_path, "write"):
+        output_path.write(svg_text.encode("utf-8"))
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(svg_text)
 
 
-def _add_editable_text(svg, comp):
+def _add_editable_text(svg, item):
     """Add text as editable <text> elements."""
-    x = comp.get("x", 0)
-    y = comp.get("y", 0)
-    w = comp.get("width", 0)
-    h = comp.get("height", 0)
-    padding = comp.get("padding", 0)
-    font_family = comp.get("fontFamily", "Arial")
-    font_size = comp.get("fontSize", 8)
-    content = comp.get("content", "")
+    x, y, w, h = item["x"], item["y"], item["w"], item["h"]
+    padding = item["padding"]
+    font_family = item["family"]
 
     # Convert pt to mm for SVG (1pt = 0.3528mm)
-    font_size_mm = font_size * 0.3528
+    font_size_mm = item["size"] * 0.3528
 
     tx = x + padding
     # Approximate baseline position (top + padding + ascent)
     ty = y + padding + font_size_mm * 0.8
 
-    if comp.get("type") == "text":
+    if item["type"] == "text":
         # Single line
         text_el = SubElement(svg, "text")
         text_el.set("x", f"{tx:.2f}")
@@ -95,22 +107,16 @@ def _add_editable_text(svg, comp):
         text_el.set("font-family", font_family)
         text_el.set("font-size", f"{font_size_mm:.2f}")
         text_el.set("fill", "black")
-        text_el.text = content
+        text_el.text = item["content"]
 
         # Clip rect
         _add_clip(svg, text_el, x, y, w, h)
     else:
         # Paragraph: create multiple <text> lines
-        # Simple word wrap estimation
         line_height = font_size_mm * 1.3
-        avg_char_w = font_size_mm * 0.5  # rough estimate
-        available_w = w - 2 * padding
-        chars_per_line = max(1, int(available_w / avg_char_w))
-
-        lines = _simple_wrap(content, chars_per_line)
         g = SubElement(svg, "g")
 
-        for i, line in enumerate(lines):
+        for i, line in enumerate(item["lines"]):
             line_y = ty + i * line_height
             if line_y > y + h - padding:
                 break
@@ -123,107 +129,100 @@ def _add_editable_text(svg, comp):
             text_el.text = line
 
 
-def _add_outlined_text(svg, comp):
+def _add_outlined_text(svg, item, glyphs=None):
     """
     Add text as outlined paths.
     Uses fonttools to extract glyph outlines when available,
     falls back to simple rectangle placeholders.
     """
-    x = comp.get("x", 0)
-    y = comp.get("y", 0)
-    w = comp.get("width", 0)
-    h = comp.get("height", 0)
-    padding = comp.get("padding", 0)
-    font_family = comp.get("fontFamily", "Arial")
-    font_size = comp.get("fontSize", 8)
-    content = comp.get("content", "")
-
-    font_size_mm = font_size * 0.3528
-
     try:
-        _add_outlined_text_fonttools(svg, comp, x, y, w, h, padding,
-                                      font_family, font_size_mm, content)
+        _add_outlined_text_fonttools(svg, item, glyphs)
     except Exception:
         # Fallback: render as non-selectable text with a note
-        _add_editable_text(svg, comp)
+        _add_editable_text(svg, item)
         # Add a comment noting outline conversion failed
         comment_el = SubElement(svg, "desc")
-        comment_el.text = f"Outline conversion unavailable for: {font_family}"
+        comment_el.text = f"Outline conversion unavailable for: {item['family']}"
 
 
-def _add_outlined_text_fonttools(svg, comp, x, y, w, h, padding,
-                                  font_family, font_size_mm, content):
-    """Convert text to SVG paths using fonttools."""
-    from tools.fonttools_outline import text_to_paths
+def _add_outlined_text_fonttools(svg, item, glyphs=None):
+    """
+    Convert text to SVG paths using fonttools; with glyphs, as <use>
+    references to glyph paths defined once.
+    """
+    from tools.fonttools_outline import text_to_glyphs, text_to_paths
 
-    tx = x + padding
-    ty = y + padding + font_size_mm * 0.8
+    y, h = item["y"], item["h"]
+    padding = item["padding"]
+    font_family = item["family"]
+    font_size_mm = item["size"] * 0.3528
 
-    if comp.get("type") == "text":
-        lines = [content]
-    else:
-        avg_char_w = font_size_mm * 0.5
-        available_w = w - 2 * padding
-        chars_per_line = max(1, int(available_w / avg_char_w))
-        lines = _simple_wrap(content, chars_per_line)
+    tx = item["x"] + padding
+    ty = y + padding + font_size_mm * 0.8
 
     line_height = font_size_mm * 1.3
     g = SubElement(svg, "g")
     g.set("fill", "black")
 
-    for i, line in enumerate(lines):
+    for i, line in enumerate(item["lines"]):
         line_y = ty + i * line_height
         if line_y > y + h - padding:
             break
-        paths = text_to_paths(line, font_family, font_size_mm, tx, line_y)
-        for path_d in paths:
-            path_el = SubElement(g, "path")
-            path_el.set("d", path_d)
-
-
-def _add_image(svg, comp):
-    """Add an image component as an embedded base64 image."""
-    x = comp.get("x", 0)
-    y = comp.get("y", 0)
-    w = comp.get("width", 0)
-    h = comp.get("height", 0)
-    data_uri = comp.get("dataUri", "")
-
+        if glyphs is None:
+            paths = text_to_paths(line, font_family, font_size_mm, tx, line_y)
+            for path_d in paths:
+                path_el = SubElement(g, "path")
+                path_el.set("d", path_d)
+        else:
+            for key, path, gx, gy in text_to_glyphs(line, font_family, font_size_mm, tx, line_y):
+                use_el = SubElement(g, "use")
+                use_el.set("xlink:href", "#" + _glyph_id(glyphs, key, path))
+                use_el.set("x", f"{gx:.4f}")
+                use_el.set("y", f"{gy:.4f}")
+
+
+def _glyph_id(glyphs, key, path):
+    """Return the <defs> id of a glyph path, adding it on first use."""
+    glyph_id = glyphs["ids"].get(key)
+    if glyph_id is None:
+        glyph_id = glyphs["ids"][key] = f"glyph{len(glyphs['ids'])}"
+        x0, y0, rel = path
+        path_el = SubElement(glyphs["defs"], "path")
+        path_el.set("id", glyph_id)
+        path_el.set("d", f"M{x0:.4f} {y0:.4f} {rel}")
+    return glyph_id
+
+
+def _add_image(svg, item, image_dpi=None):
+    """Add an image item as an embedded base64 image, downsampled to image_dpi."""
+    data_uri = item["ref"]
     if not data_uri:
         return
 
+    w, h = item["w"], item["h"]
     img = SubElement(svg, "image")
-    img.set("x", f"{x:.2f}")
-    img.set("y", f"{y:.2f}")
+    img.set("x", f"{item['x']:.2f}")
+    img.set("y", f"{item['y']:.2f}")
     img.set("width", f"{w:.2f}")
     img.set("height", f"{h:.2f}")
-    img.set("href", data_uri)
+    img.set("href", get_data_uri(data_uri, w * mm, h * mm, image_dpi))
     img.set("preserveAspectRatio", "xMidYMid meet")
 
 
+def _add_barcode(svg, item):
+    """Add a barcode or QR code item as a single filled path."""
+    symbol = item["symbol"]
+    if symbol is None:
+        return
+
+    path_el = SubElement(svg, "path")
+    path_el.set("d", symbol["svg_path"])
+    path_el.set("transform", svg_transform(symbol, item["x"], item["y"], item["w"], item["h"]))
+    path_el.set("fill", "black")
+
+
 def _add_clip(svg, text_el, x, y, w, h):
     """Add a clip path to constrain text within bounds."""
     # For simplicity, we skip clip paths in this version
     # Illustrator handles overflow clipping well
     pass
-
-
-def _simple_wrap(text, chars_per_line):
-    """Simple word wrap by character count estimate."""
-    words = text.split()
-    lines = []
-    current = ""
-
-    for word in words:
-        test = (current + " " + word).strip()
-        if len(test) <= chars_per_line:
-            current = test
-        else:
-            if current:
-                lines.append(current)
-            current = word
-
-    if current:
-        lines.append(current)
-
-    return lines
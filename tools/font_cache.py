@@ -0,0 +1,177 @@
+"""
+Shared font registry and glyph outline cache.
+
+Each font file is opened once per process and reused by every outlined
+export. Glyph outlines are cached as cubic segments in font units, so the
+AI and SVG outliners only have to scale and translate them.
+
+Segments are tuples:
+  ("M", x, y)                      move to
+  ("L", x, y)                      line to
+  ("C", x1, y1, x2, y2, x3, y3)    cubic bezier
+  ("Z",)                           close path
+"""
+
+import os
+import platform
+import threading
+from collections import OrderedDict
+
+from fontTools.pens.basePen import BasePen
+
+# Maximum number of glyph outlines kept in memory
+GLYPH_CACHE_SIZE = 4096
+
+_SYSTEM_FONT_FILES = {
+    "Arial": "arial.ttf",
+    "Helvetica": "arial.ttf",  # Helvetica falls back to Arial
+    "Times New Roman": "times.ttf",
+    "Courier New": "cour.ttf",
+    "Georgia": "georgia.ttf",
+    "Verdana": "verdana.ttf",
+}
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+_glyphs = OrderedDict()
+_glyphs_lock = threading.Lock()
+
+_stats = {"font_hits": 0, "font_misses": 0, "glyph_hits": 0, "glyph_misses": 0}
+
+
+class _CubicSegmentPen(BasePen):
+    """Record a glyph as cubic segments; quadratics are converted by BasePen."""
+
+    def __init__(self, glyph_set):
+        super().__init__(glyph_set)
+        self.segments = []
+
+    def _moveTo(self, pt):
+        self.segments.append(("M", pt[0], pt[1]))
+
+    def _lineTo(self, pt):
+        self.segments.append(("L", pt[0], pt[1]))
+
+    def _curveToOne(self, pt1, pt2, pt3):
+        self.segments.append(("C", pt1[0], pt1[1], pt2[0], pt2[1], pt3[0], pt3[1]))
+
+    def _closePath(self):
+        self.segments.append(("Z",))
+
+
+def find_system_font(font_family):
+    """Locate a system font file matching the requested family."""
+    filename = _SYSTEM_FONT_FILES.get(font_family, "arial.ttf")
+
+    if platform.system() == "Windows":
+        font_dir = os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts")
+    elif platform.system() == "Darwin":
+        font_dir = "/Library/Fonts"
+    else:
+        font_dir = "/usr/share/fonts/truetype"
+
+    path = os.path.join(font_dir, filename)
+    if os.path.exists(path):
+        return path
+
+    # Try case-insensitive search on Windows
+    if platform.system() == "Windows" and os.path.isdir(font_dir):
+        lower = filename.lower()
+        for f in os.listdir(font_dir):
+            if f.lower() == lower:
+                return os.path.join(font_dir, f)
+
+    return None
+
+
+def get_font(font_family):
+    """
+    Return the shared font entry for a family, loading it on first use.
+
+    The entry is a dict with 'path', 'glyph_set', 'cmap' and
+    'units_per_em'. Raises FileNotFoundError if no font file is found.
+    """
+    font_path = find_system_font(font_family)
+    if not font_path:
+        raise FileNotFoundError(f"Font not found: {font_family}")
+
+    with _fonts_lock:
+        entry = _fonts.get(font_path)
+        if entry is not None:
+            _stats["font_hits"] += 1
+            return entry
+        _stats["font_misses"] += 1
+
+        from fontTools.ttLib import TTFont
+        font = TTFont(font_path)
+        entry = {
+            "path": font_path,
+            "font": font,
+            "glyph_set": font.getGlyphSet(),
+            "cmap": font.getBestCmap(),
+            "units_per_em": font["head"].unitsPerEm,
+            # TTFont loads tables lazily and is not safe to draw from
+            # several threads at once
+            "lock": threading.Lock(),
+        }
+        _fonts[font_path] = entry
+        return entry
+
+
+def glyph_outline(font, char):
+    """
+    Return (segments, advance) for a character in font units.
+
+    Args:
+        font: entry returned by get_font()
+        char: single character string
+
+    Returns:
+        tuple of (segments, advance width) or None if the font has no
+        glyph for the character. The advance is None if unknown.
+    """
+    key = (font["path"], char)
+    with _glyphs_lock:
+        outline = _glyphs.get(key)
+        if outline is not None:
+            _glyphs.move_to_end(key)
+            _stats["glyph_hits"] += 1
+            return outline or None
+        _stats["glyph_misses"] += 1
+
+    glyph_name = font["cmap"].get(ord(char))
+    if not glyph_name:
+        outline = ()
+    else:
+        with font["lock"]:
+            glyph = font["glyph_set"][glyph_name]
+            pen = _CubicSegmentPen(font["glyph_set"])
+            glyph.draw(pen)
+        outline = (tuple(pen.segments), getattr(glyph, "width", None))
+
+    with _glyphs_lock:
+        _glyphs[key] = outline
+        if len(_glyphs) > GLYPH_CACHE_SIZE:
+            _glyphs.popitem(last=False)
+    return outline or None
+
+
+def cache_stats():
+    """Return hit/miss counters and current sizes of the font caches."""
+    with _glyphs_lock:
+        stats = dict(_stats)
+        stats["glyphs_cached"] = len(_glyphs)
+    stats["fonts_loaded"] = len(_fonts)
+    stats["glyph_cache_size"] = GLYPH_CACHE_SIZE
+    return stats
+
+
+def clear_cache():
+    """Drop all cached glyph outlines and loaded fonts."""
+    with _fonts_lock:
+        for entry in _fonts.values():
+            entry["font"].close()
+        _fonts.clear()
+    with _glyphs_lock:
+        _glyphs.clear()
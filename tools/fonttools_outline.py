@@ -3,45 +3,23 @@ Font outline conversion helper.
 
 Converts text strings to SVG path data using fonttools.
 Used for "outlined" SVG export where text is not editable.
-"""
-
-import os
-import sys
-import platform
-
+Glyph outlines come from the shared cache in tools.font_cache.
 
-def _find_system_font(font_family):
-    """Locate a system font file matching the requested family."""
-    font_map = {
-        "Arial": "arial.ttf",
-        "Helvetica": "arial.ttf",  # Helvetica fallback to Arial on Windows
-        "Times New Roman": "times.ttf",
-        "Courier New": "cour.ttf",
-        "Georgia": "georgia.ttf",
-        "Verdana": "verdana.ttf",
-    }
-
-    filename = font_map.get(font_family, "arial.ttf")
+Each glyph is written once per size as relative path commands, which do
+not depend on where the glyph is placed; drawing it then only prepends
+an absolute moveto for its origin.
+"""
 
-    if platform.system() == "Windows":
-        font_dir = os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts")
-    elif platform.system() == "Darwin":
-        font_dir = "/Library/Fonts"
-    else:
-        font_dir = "/usr/share/fonts/truetype"
+import threading
+from collections import OrderedDict
 
-    path = os.path.join(font_dir, filename)
-    if os.path.exists(path):
-        return path
+from tools.font_cache import get_font, glyph_outline
 
-    # Try case-insensitive search on Windows
-    if platform.system() == "Windows" and os.path.isdir(font_dir):
-        lower = filename.lower()
-        for f in os.listdir(font_dir):
-            if f.lower() == lower:
-                return os.path.join(font_dir, f)
+# Maximum number of formatted glyph paths kept in memory
+PATH_CACHE_SIZE = 4096
 
-    return None
+_paths = OrderedDict()  # (font path, char, scale) -> (x0, y0, relative path)
+_paths_lock = threading.Lock()
 
 
 def text_to_paths(text, font_family, font_size_mm, start_x, baseline_y):
@@ -58,157 +36,110 @@ def text_to_paths(text, font_family, font_size_mm, start_x, baseline_y):
     Returns:
         list of SVG path 'd' strings
     """
-    from fontTools.ttLib import TTFont
-    from fontTools.pens.svgPathPen import SVGPathPen
+    return [
+        f"M{x + x0:.4f} {y + y0:.4f} {rel}"
+        for _, (x0, y0, rel), x, y in text_to_glyphs(
+            text, font_family, font_size_mm, start_x, baseline_y)
+    ]
 
-    font_path = _find_system_font(font_family)
-    if not font_path:
-        raise FileNotFoundError(f"Could not find font: {font_family}")
 
-    font = TTFont(font_path)
-    glyph_set = font.getGlyphSet()
-    cmap = font.getBestCmap()
-    units_per_em = font["head"].unitsPerEm
+def text_to_glyphs(text, font_family, font_size_mm, start_x, baseline_y):
+    """
+    Lay out a text string as glyph placements, for output that defines
+    each distinct glyph once and references it.
+
+    Arguments are as for text_to_paths().
+
+    Returns:
+        list of (key, path, x, y): key identifies the glyph shape at this
+        size, path is its (x0, y0, relative path) with the origin at 0, 0,
+        and x, y is the origin to place it at in mm
+    """
+    font = get_font(font_family)
 
     # Scale factor: font units to mm
-    scale = font_size_mm / units_per_em
+    scale = font_size_mm / font["units_per_em"]
 
-    paths = []
+    glyphs = []
     cursor_x = start_x
 
     for char in text:
-        code = ord(char)
-        glyph_name = cmap.get(code)
-        if not glyph_name:
+        outline = glyph_outline(font, char)
+        if outline is None:
             # Skip unmapped characters, advance by space width estimate
             cursor_x += font_size_mm * 0.3
             continue
 
-        glyph = glyph_set[glyph_name]
-        pen = SVGPathPen(glyph_set)
-        glyph.draw(pen)
-        raw_path = pen.getCommands()
-
-        if raw_path:
-            # Transform: scale and translate
-            # Font coordinates: y-up, origin at baseline
-            # SVG coordinates: y-down
-            transformed = _transform_path(raw_path, scale, cursor_x, baseline_y)
-            if transformed:
-                paths.append(transformed)
+        segments, advance = outline
+        if segments:
+            key = (font["path"], char, scale)
+            glyphs.append((key, _glyph_path(key, segments, scale), cursor_x, baseline_y))
 
         # Advance cursor
-        if hasattr(glyph, "width"):
-            cursor_x += glyph.width * scale
+        if advance is not None:
+            cursor_x += advance * scale
         else:
             cursor_x += font_size_mm * 0.5
 
-    font.close()
-    return paths
+    return glyphs
 
 
-def _transform_path(path_str, scale, tx, ty):
-    """
-    Transform an SVG path string: scale and translate.
-    Flips Y axis (font y-up to SVG y-down).
-    """
-    import re
+def _glyph_path(key, segments, scale):
+    """Return the cached (x0, y0, relative path) of a glyph at scale."""
+    with _paths_lock:
+        path = _paths.get(key)
+        if path is not None:
+            _paths.move_to_end(key)
+            return path
+
+    path = _relative_path(segments, scale)
 
-    commands = re.findall(r'([MmLlHhVvCcSsQqTtAaZz])|(-?\d+\.?\d*)', path_str)
+    with _paths_lock:
+        _paths[key] = path
+        if len(_paths) > PATH_CACHE_SIZE:
+            _paths.popitem(last=False)
+    return path
+
+
+def _relative_path(segments, scale):
+    """
+    Format cubic segments in font units as relative SVG path commands.
 
+    Coordinates are scaled, Y is flipped (font y-up to SVG y-down) and
+    rounded to 4 decimals before differencing, so the rounding does not
+    accumulate along the outline. This runs once per glyph and size, so
+    the output is also kept compact. Returns the first point (the glyph's
+    initial moveto, relative to its origin) and the commands after it.
+    """
     result = []
-    i = 0
-    tokens = []
-
-    # Tokenize
-    for match in re.finditer(r'([A-Za-z])|(-?\d+\.?\d*(?:e[+-]?\d+)?)', path_str):
-        token = match.group()
-        tokens.append(token)
-
-    idx = 0
-    while idx < len(tokens):
-        token = tokens[idx]
-        if token.isalpha():
-            cmd = token
-            result.append(cmd)
-            idx += 1
-
-            if cmd in ('Z', 'z'):
-                continue
-
-            # Determine how many coordinate pairs this command expects
-            if cmd in ('M', 'L', 'T'):
-                # Absolute: pairs of (x, y)
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    x = float(tokens[idx]) * scale + tx
-                    y = -float(tokens[idx + 1]) * scale + ty
-                    result.append(f"{x:.4f}")
-                    result.append(f"{y:.4f}")
-                    idx += 2
-            elif cmd in ('m', 'l', 't'):
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    x = float(tokens[idx]) * scale
-                    y = -float(tokens[idx + 1]) * scale
-                    result.append(f"{x:.4f}")
-                    result.append(f"{y:.4f}")
-                    idx += 2
-            elif cmd == 'H':
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    x = float(tokens[idx]) * scale + tx
-                    result.append(f"{x:.4f}")
-                    idx += 1
-            elif cmd == 'h':
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    x = float(tokens[idx]) * scale
-                    result.append(f"{x:.4f}")
-                    idx += 1
-            elif cmd == 'V':
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    y = -float(tokens[idx]) * scale + ty
-                    result.append(f"{y:.4f}")
-                    idx += 1
-            elif cmd == 'v':
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    y = -float(tokens[idx]) * scale
-                    result.append(f"{y:.4f}")
-                    idx += 1
-            elif cmd in ('C', 'S'):
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    pairs = 6 if cmd == 'C' else 4
-                    for p in range(0, pairs, 2):
-                        if idx + 1 < len(tokens):
-                            x = float(tokens[idx]) * scale + tx
-                            y = -float(tokens[idx + 1]) * scale + ty
-                            result.append(f"{x:.4f}")
-                            result.append(f"{y:.4f}")
-                            idx += 2
-            elif cmd in ('c', 's'):
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    pairs = 6 if cmd == 'c' else 4
-                    for p in range(0, pairs, 2):
-                        if idx + 1 < len(tokens):
-                            x = float(tokens[idx]) * scale
-                            y = -float(tokens[idx + 1]) * scale
-                            result.append(f"{x:.4f}")
-                            result.append(f"{y:.4f}")
-                            idx += 2
-            elif cmd in ('Q', 'q'):
-                while idx < len(tokens) and not tokens[idx].isalpha():
-                    for p in range(2):
-                        if idx + 1 < len(tokens):
-                            if cmd == 'Q':
-                                x = float(tokens[idx]) * scale + tx
-                                y = -float(tokens[idx + 1]) * scale + ty
-                            else:
-                                x = float(tokens[idx]) * scale
-                                y = -float(tokens[idx + 1]) * scale
-                            result.append(f"{x:.4f}")
-                            result.append(f"{y:.4f}")
-                            idx += 2
-            else:
-                # Unknown command, skip
-                idx += 1
+    x0 = y0 = None
+    cx = cy = sx = sy = 0.0
+    for seg in segments:
+        op = seg[0]
+        if op == "Z":
+            result.append("z")
+            cx, cy = sx, sy
+            continue
+        pts = [(round(seg[j] * scale, 4), round(-seg[j + 1] * scale, 4))
+               for j in range(1, len(seg), 2)]
+        if x0 is None:
+            # The leading moveto is made absolute by text_to_paths()
+            x0, y0 = pts[0]
         else:
-            idx += 1
+            result.append(op.lower() + " ".join(
+                f"{_num(px - cx)} {_num(py - cy)}" for px, py in pts))
+        cx, cy = pts[-1]
+        if op == "M":
+            sx, sy = cx, cy
+    return x0, y0, " ".join(result)
+
+
+def _num(value):
+    """Format a coordinate with at most 4 decimals and no trailing zeros."""
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
 
-    return " ".join(result)
+def clear_cache():
+    with _paths_lock:
+        _paths.clear()
@@ -0,0 +1,277 @@
+"""
+Decoded image cache shared by the exporters.
+
+Images are keyed by content hash: the asset id for asset URLs, or the
+SHA-256 of the data URI itself, so a hit costs no base64 decoding. Each
+entry is a reportlab ImageReader whose pixel data has already been
+decoded; reportlab embeds draws with identical pixel data as a single
+image XObject, so a logo repeated on every label of a run is decoded
+once per process and embedded once per output document. SVG export uses
+the same cache for its self-contained data URIs.
+
+Images with far more pixels than the printed size needs are embedded as
+downsampled variants; see get_image().
+
+The cache is an LRU bounded by the approximate decoded size in bytes.
+"""
+
+import base64
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+
+from tools.assets import (image_data_uri, parse_ref, read_image, sniff_mime,
+                          variant_path, write_file)
+
+# Approximate decoded bytes kept in memory
+IMAGE_CACHE_BYTES = 128 * 1024 * 1024
+
+# Resolution images are embedded at unless the export asks otherwise, and
+# the range an export may ask for
+DEFAULT_IMAGE_DPI = 300
+MIN_IMAGE_DPI = 72
+MAX_IMAGE_DPI = 1200
+VARIANT_JPEG_QUALITY = 90
+
+# Colour modes variants are resampled in as is; others (palette, bilevel)
+# are expanded to RGB(A) first. Part of the variant file name is
+# VARIANT_VERSION, bumped when variants are encoded differently.
+VARIANT_MODES = ("L", "LA", "RGB", "RGBA", "CMYK")
+VARIANT_VERSION = 2
+
+# Entries kept in the small pixel-size lookups before they are reset
+PIXEL_SIZE_CACHE = 4096
+
+_cache = OrderedDict()  # key -> (value, size)
+_cache_bytes = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+_pixel_sizes = {}    # key -> (px_w, px_h)
+_variant_sizes = {}  # (key, width, height, dpi, fit) -> variant size or ()
+
+
+def image_key(ref):
+    """Return the content-hash cache key for an image reference."""
+    asset_id = parse_ref(ref)
+    if asset_id:
+        return asset_id
+    return hashlib.sha256(ref.encode("utf-8")).hexdigest()
+
+
+def _lookup(key):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return entry[0]
+
+
+def _store(key, value, size):
+    global _cache_bytes
+    with _lock:
+        if key in _cache:
+            return _cache[key][0]
+        _cache[key] = (value, size)
+        _cache_bytes += size
+        while _cache_bytes > IMAGE_CACHE_BYTES and len(_cache) > 1:
+            _, (_, old_size) = _cache.popitem(last=False)
+            _cache_bytes -= old_size
+    return value
+
+
+def _pixel_size(key, data):
+    """Return the (width, height) in pixels of an image, cached by key."""
+    size = _pixel_sizes.get(key)
+    if size is None:
+        with Image.open(io.BytesIO(data)) as im:
+            size = im.size
+        if len(_pixel_sizes) >= PIXEL_SIZE_CACHE:
+            _pixel_sizes.clear()
+        _pixel_sizes[key] = size
+    return size
+
+
+def target_size(px_w, px_h, width, height, dpi, fit=True):
+    """
+    Return the pixel size needed to print an image at dpi, or None if the
+    image has no more pixels than that already.
+
+    width/height are the box in points; fit means the image is scaled into
+    the box keeping its aspect ratio, otherwise it is stretched to fill it.
+    """
+    if fit:
+        scale = min(width / px_w, height / px_h)
+        width, height = px_w * scale, px_h * scale
+    need_w = max(1, math.ceil(width / 72.0 * dpi))
+    need_h = max(1, math.ceil(height / 72.0 * dpi))
+    if need_w >= px_w and need_h >= px_h:
+        return None
+    return min(need_w, px_w), min(need_h, px_h)
+
+
+def make_variant(data, size):
+    """
+    Downsample image bytes to size and recompress them.
+
+    JPEG sources stay JPEG (quality VARIANT_JPEG_QUALITY) in their own
+    colour mode, so CMYK artwork stays CMYK; everything else becomes a
+    lossless PNG, so logos and line art keep sharp edges and masks.
+    """
+    with Image.open(io.BytesIO(data)) as im:
+        jpeg = im.format == "JPEG"
+        if jpeg:
+            # Let the decoder skip detail that is thrown away anyway
+            im.draft(im.mode, size)
+        icc_profile = im.info.get("icc_profile")
+        if im.mode not in VARIANT_MODES or "transparency" in im.info:
+            alpha = im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info
+            im = im.convert("RGBA" if alpha else "RGB")
+        im = im.resize(size, Image.LANCZOS)
+    out = io.BytesIO()
+    if jpeg:
+        im.save(out, "JPEG", quality=VARIANT_JPEG_QUALITY, optimize=True, icc_profile=icc_profile)
+    else:
+        im.save(out, "PNG", optimize=True, icc_profile=icc_profile)
+    return out.getvalue()
+
+
+def _variant_size(key, ref, width, height, dpi, fit):
+    """Return the variant pixel size to embed, or () for the original."""
+    if not (dpi and width and height):
+        return ()
+    lookup = (key, width, height, dpi, fit)
+    size = _variant_sizes.get(lookup)
+    if size is None:
+        data = read_image(ref)
+        if data is None:
+            return ()
+        try:
+            px_size = _pixel_size(key, data)
+        except Exception:
+            # Not something PIL reads (e.g. SVG): embed as is
+            px_size = None
+        size = px_size and target_size(*px_size, width, height, dpi, fit) or ()
+        if len(_variant_sizes) >= PIXEL_SIZE_CACHE:
+            _variant_sizes.clear()
+        _variant_sizes[lookup] = size
+    return size
+
+
+def _variant_data(key, ref, size):
+    """Return the bytes of a downsampled variant, making it on first use."""
+    path = variant_path(key, "v%d-%dx%d" % ((VARIANT_VERSION,) + size))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    data = read_image(ref)
+    if data is None:
+        return None
+    variant = make_variant(data, size)
+    write_file(path, variant)
+    return variant
+
+
+def get_image(ref, width=None, height=None, dpi=None, fit=True):
+    """
+    Return a decoded ImageReader for an asset URL or data URI.
+
+    Given the drawn box (width/height in points) and a target dpi, an image
+    with more pixels than printing it at that resolution needs is replaced
+    by a downsampled variant, made once and kept on disk next to the
+    assets; the original is left untouched for re-export at a higher dpi.
+
+    Returns None if the reference cannot be resolved; raises if the bytes
+    are not a readable image.
+    """
+    if not ref:
+        return None
+    key = image_key(ref)
+    size = _variant_size(key, ref, width, height, dpi, fit)
+    cache_key = "reader:" + key + ("@%dx%d" % size if size else "")
+    reader = _lookup(cache_key)
+    if reader is not None:
+        return reader
+    data = _variant_data(key, ref, size) if size else read_image(ref)
+    if data is None:
+        return None
+    reader = ImageReader(io.BytesIO(data))
+    # Decode now, once, so shared readers are never lazily loaded by two
+    # exports at the same time
+    cost = len(reader.getRGBData()) + len(data)
+    if reader._dataA is not None:
+        cost += len(reader._dataA.getRGBData())
+    return _store(cache_key, reader, cost)
+
+
+def export_dpi(data):
+    """
+    Return the image resolution an export payload asks for (None keeps originals).
+
+    Raises ValueError unless it is a whole number from MIN_IMAGE_DPI to
+    MAX_IMAGE_DPI, or empty.
+    """
+    dpi = data.get("imageDpi", DEFAULT_IMAGE_DPI)
+    if not dpi:
+        return None
+    if isinstance(dpi, str) and dpi.strip().isdigit():
+        dpi = int(dpi)
+    if isinstance(dpi, bool) or not isinstance(dpi, int) or not MIN_IMAGE_DPI <= dpi <= MAX_IMAGE_DPI:
+        raise ValueError(f"imageDpi must be a whole number from {MIN_IMAGE_DPI} to {MAX_IMAGE_DPI}")
+    return dpi
+
+
+def get_data_uri(ref, width=None, height=None, dpi=None):
+    """
+    Return ref as a self-contained data URI, cached by content hash.
+
+    width/height/dpi select a downsampled variant as in get_image().
+    """
+    if not ref:
+        return ref
+    key = image_key(ref)
+    size = _variant_size(key, ref, width, height, dpi, True)
+    if not size and ref.startswith("data:"):
+        return ref
+    cache_key = "uri:" + key + ("@%dx%d" % size if size else "")
+    uri = _lookup(cache_key)
+    if uri is not None:
+        return uri
+    if size:
+        data = _variant_data(key, ref, size)
+        if data is None:
+            return ref
+        uri = "data:%s;base64,%s" % (sniff_mime(data), base64.b64encode(data).decode("ascii"))
+    else:
+        uri = image_data_uri(ref)
+        if not uri.startswith("data:"):
+            return uri
+    return _store(cache_key, uri, len(uri))
+
+
+def cache_stats():
+    """Return hit/miss counters and the current size of the image cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["images_cached"] = len(_cache)
+        stats["bytes_cached"] = _cache_bytes
+    stats["cache_limit_bytes"] = IMAGE_CACHE_BYTES
+    return stats
+
+
+def clear_cache():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
+    _pixel_sizes.clear()
+    _variant_sizes.clear()
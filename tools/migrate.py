@@ -0,0 +1,209 @@
+"""
+Versioned schema migrations.
+
+The schema version is kept in PRAGMA user_version. A database at
+SCHEMA_VERSION costs one PRAGMA read; otherwise every pending step runs
+in a single transaction and the version is bumped with it. New databases
+are created from sql/schema.sql, which stamps the current version itself.
+
+Databases from before versioning report version 0 and may be at any
+point of the old ad-hoc migrations, so the early steps check what is
+already there before changing anything.
+"""
+
+import json
+import os
+import time
+
+from tools.assets import store_bg_images, store_data_uri
+from tools.pathpack import pack_path
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(BASE_DIR, "sql", "schema.sql")
+
+# Current definition, used when components has to be created or rebuilt
+_COMPONENTS_TABLE = """CREATE TABLE {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    template_id INTEGER NOT NULL REFERENCES templates(id) ON DELETE CASCADE,
+    partition_id INTEGER REFERENCES partitions(id) ON DELETE SET NULL,
+    page INTEGER NOT NULL DEFAULT 0,
+    type TEXT NOT NULL CHECK(type IN ('text','paragraph','barcode','qrcode','image','pdfpath')),
+    content TEXT DEFAULT '',
+    x REAL NOT NULL DEFAULT 0,
+    y REAL NOT NULL DEFAULT 0,
+    w REAL NOT NULL DEFAULT 20,
+    h REAL NOT NULL DEFAULT 10,
+    font_family TEXT DEFAULT 'Arial',
+    font_size REAL DEFAULT 8,
+    sort_order INTEGER DEFAULT 0,
+    path_data BLOB DEFAULT NULL,
+    group_id TEXT DEFAULT NULL,
+    visible INTEGER DEFAULT 1,
+    locked INTEGER DEFAULT 0
+)"""
+
+
+def _columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_columns(conn, table, columns):
+    existing = _columns(conn, table)
+    for name, decl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def _templates_columns(conn):
+    _add_columns(conn, "templates", [
+        ("bg_image", "TEXT DEFAULT ''"),
+        ("source", "TEXT DEFAULT 'drawing'"),
+    ])
+
+
+def _partitions_columns(conn):
+    _add_columns(conn, "partitions", [
+        ("page", "INTEGER NOT NULL DEFAULT 0"),
+        ("locked", "INTEGER NOT NULL DEFAULT 0"),
+    ])
+
+
+def _components_table(conn):
+    """Create components, or rebuild it if its type CHECK lacks 'pdfpath'."""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='components'"
+    ).fetchone()
+    if row is None:
+        conn.execute(_COMPONENTS_TABLE.format(name="components"))
+        return
+    if "'pdfpath'" in row[0]:
+        return
+    old = _columns(conn, "components")
+    conn.execute(_COMPONENTS_TABLE.format(name="components_new"))
+    keep = ", ".join(c for c in _columns(conn, "components_new") if c in old)
+    conn.execute(f"INSERT INTO components_new ({keep}) SELECT {keep} FROM components")
+    conn.execute("DROP TABLE components")
+    conn.execute("ALTER TABLE components_new RENAME TO components")
+
+
+def _components_columns(conn):
+    _add_columns(conn, "components", [
+        ("path_data", "BLOB DEFAULT NULL"),
+        ("group_id", "TEXT DEFAULT NULL"),
+        ("visible", "INTEGER DEFAULT 1"),
+        ("locked", "INTEGER DEFAULT 0"),
+    ])
+
+
+def _pack_path_data(conn):
+    """Convert JSON path_data to packed blobs (tools/pathpack.py)."""
+    packed = []
+    for cid, value in conn.execute(
+            "SELECT id, path_data FROM components WHERE typeof(path_data)='text'"):
+        blob = pack_path(json.loads(value)) if value else None
+        if blob is not None:
+            packed.append((blob, cid))
+    conn.executemany("UPDATE components SET path_data=? WHERE id=?", packed)
+
+
+def _indexes(conn):
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_members_parent ON members(parent_type, parent_id)",
+        "CREATE INDEX IF NOT EXISTS idx_templates_customer ON templates(customer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_partitions_template ON partitions(template_id)",
+        "CREATE INDEX IF NOT EXISTS idx_components_template ON components(template_id, page, sort_order)",
+        "CREATE INDEX IF NOT EXISTS idx_components_partition ON components(partition_id)",
+    ):
+        conn.execute(sql)
+
+
+def _image_assets(conn):
+    """Move inline base64 images into the asset store (tools/assets.py)."""
+    conn.executemany("UPDATE templates SET bg_image=? WHERE id=?", [
+        (store_bg_images(bg), tid) for tid, bg in conn.execute(
+            "SELECT id, bg_image FROM templates WHERE bg_image LIKE '%data:%'")
+    ])
+    conn.executemany("UPDATE components SET content=? WHERE id=?", [
+        (store_data_uri(content), cid) for cid, content in conn.execute(
+            "SELECT id, content FROM components WHERE type='image' AND content LIKE 'data:%'")
+    ])
+
+
+def _template_revision(conn):
+    _add_columns(conn, "templates", [
+        ("revision", "INTEGER NOT NULL DEFAULT 0"),
+    ])
+
+
+def _bg_image_maps(conn):
+    """Store single-image bg_image values as a page map (see store_bg_images)."""
+    conn.executemany("UPDATE templates SET bg_image=? WHERE id=?", [
+        (store_bg_images(bg), tid) for tid, bg in conn.execute(
+            "SELECT id, bg_image FROM templates WHERE bg_image != '' AND bg_image NOT LIKE '{%'")
+    ])
+
+
+# (version, name, step) in order. Append new steps at the end and update
+# the PRAGMA user_version line in sql/schema.sql to match.
+MIGRATIONS = (
+    (1, "templates columns", _templates_columns),
+    (2, "partitions columns", _partitions_columns),
+    (3, "components table", _components_table),
+    (4, "components columns", _components_columns),
+    (5, "packed path_data", _pack_path_data),
+    (6, "indexes", _indexes),
+    (7, "image assets", _image_assets),
+    (8, "template revision", _template_revision),
+    (9, "bg image maps", _bg_image_maps),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """
+    Bring the database on conn up to SCHEMA_VERSION.
+
+    Returns the names of the steps applied (empty when it was current).
+    The connection is switched to manual transaction control.
+    """
+    conn.isolation_level = None
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return []
+
+    has_schema = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='templates'"
+    ).fetchone()
+    if not has_schema:
+        with open(SCHEMA_PATH, "r") as f:
+            conn.executescript(f.read())
+        return ["schema"]
+
+    applied = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for step_version, name, step in MIGRATIONS:
+            if step_version > version:
+                step(conn)
+                applied.append(name)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return applied
+
+
+if __name__ == "__main__":
+    import sqlite3
+    from tools.assets import set_asset_dir
+    from tools.init_db import DB_PATH
+
+    set_asset_dir(os.path.join(os.path.dirname(DB_PATH), "assets"))
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(DB_PATH)
+    steps = migrate(conn)
+    conn.close()
+    print(f"{DB_PATH}: schema v{SCHEMA_VERSION}, applied {steps or 'nothing'} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,159 @@
+"""
+Path engine for pdfpath components.
+
+Turns pathData geometry (mm, top-left origin) into PDF path operators in
+one pass instead of one reportlab call per op: the mm scaling and Y flip
+are applied to whole coordinate arrays (with NumPy when it is installed),
+all numbers are formatted by one string operation that reproduces
+reportlab's fp_str, and the operators are handed to the canvas as one
+path. The content stream is byte-identical to building the path with
+moveTo/lineTo/curveTo/close.
+"""
+
+from reportlab.lib.rl_accel import fp_str
+from reportlab.lib.units import mm
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Op letter -> (opcode, number of coordinates)
+_OPS = {"M": (0, 2), "L": (1, 2), "C": (2, 6), "Z": (3, 0)}
+
+# Operator templates per opcode, filled from the formatted numbers
+_TEMPLATES = ("%s %s m", "%s %s l", "%s %s %s %s %s %s c", "h")
+
+# Below this many coordinates the NumPy round trip costs more than it saves
+_NUMPY_MIN_COORDS = 64
+
+# fp_str prints 6 significant decimals: "%.6f" up to 10, "%.5f" up to 100...
+# Index 7 is a placeholder for values fp_str prints as a bare "0".
+_NUMBER_FORMATS = ("%.0f", "%.1f", "%.2f", "%.3f", "%.4f", "%.5f", "%.6f", "Z")
+_PRECISION_BOUNDS = (10.0, 100.0, 1e3, 1e4, 1e5, 1e6)
+_ZERO_LIMIT = 1e-7
+
+
+def path_arrays(path_data):
+    """
+    Flatten pathData ops into (opcodes, coords).
+
+    Ops with too few arguments are skipped, like the old per-op loop did;
+    extra arguments are ignored.
+    """
+    opcodes = []
+    coords = []
+    for op in path_data.get("ops", []):
+        spec = _OPS.get(op.get("o", ""))
+        if spec is None:
+            continue
+        code, n = spec
+        if n:
+            a = op.get("a", [])
+            if len(a) < n:
+                continue
+            coords.extend(a[:n])
+        opcodes.append(code)
+    return opcodes, coords
+
+
+def _precision(sa):
+    if sa <= _ZERO_LIMIT:
+        return 7
+    for i, bound in enumerate(_PRECISION_BOUNDS):
+        if sa < bound:
+            return 6 - i
+    return 0
+
+
+def format_numbers(values):
+    """
+    Return the numbers space-separated, exactly as fp_str(values) would.
+
+    values may be a list of floats or a NumPy array.
+    """
+    if len(values) == 0:
+        return ""
+    if np is not None and len(values) >= _NUMPY_MIN_COORDS:
+        arr = np.asarray(values, dtype=np.float64)
+        sa = np.abs(arr)
+        if not np.isfinite(sa).all() or sa.max() >= _PRECISION_BOUNDS[-1]:
+            return fp_str(arr.tolist())
+        precision = 6 - np.searchsorted(_PRECISION_BOUNDS, sa, side="right")
+        zero = sa <= _ZERO_LIMIT
+        precision[zero] = 7
+        fmt = " ".join(map(_NUMBER_FORMATS.__getitem__, precision.tolist()))
+        numbers = arr[~zero].tolist()
+    else:
+        precisions = [_precision(abs(v)) for v in values]
+        if 0 in precisions:
+            # Huge values print without a decimal point; leave them to fp_str
+            return fp_str(values)
+        fmt = " ".join([_NUMBER_FORMATS[p] for p in precisions])
+        numbers = [v for v, p in zip(values, precisions) if p != 7]
+
+    # One formatting pass, then fp_str's trimming: "1.500000" -> "1.5",
+    # "2.000000" -> "2" and "0.25" -> ".25". Every formatted number has a
+    # decimal point, so stripping "0 " one digit per pass stops there.
+    text = " " + fmt % tuple(numbers) + " "
+    while "0 " in text:
+        text = text.replace("0 ", " ")
+    text = text.replace(". ", " ").replace(" 0.", " .").replace("Z", "0")
+    return text[1:-1]
+
+
+def transform_coords(coords, page_h):
+    """
+    Scale mm coordinates to points and flip Y.
+
+    coords is a flat, interleaved x, y list; the result is a list, or a
+    NumPy array when NumPy handled the transform.
+    """
+    if np is not None and len(coords) >= _NUMPY_MIN_COORDS:
+        arr = np.asarray(coords, dtype=np.float64)
+        arr *= mm
+        arr[1::2] = page_h - arr[1::2]
+        return arr
+    out = [v * mm for v in coords]
+    out[1::2] = [page_h - v for v in out[1::2]]
+    return out
+
+
+def path_code(opcodes, coords, page_h):
+    """Return the PDF path operators for flattened path arrays."""
+    if not opcodes:
+        return ""
+    template = " ".join([_TEMPLATES[code] for code in opcodes])
+    if coords:
+        numbers = format_numbers(transform_coords(coords, page_h)).split(" ")
+        template = template % tuple(numbers)
+    # reportlab starts every path with an 'n' (end any previous path)
+    return "n " + template
+
+
+def draw_pdfpath(c, comp, page_h):
+    """Draw a vector path object extracted from a PDF."""
+    path_data = comp.get("pathData", {})
+    if not path_data.get("ops"):
+        return
+
+    opcodes, coords = path_arrays(path_data)
+    code = path_code(opcodes, coords, page_h)
+
+    fill = path_data.get("fill")
+    stroke = path_data.get("stroke")
+    lw = path_data.get("lw", 0.5)
+
+    do_fill = 0
+    do_stroke = 0
+    if fill:
+        c.setFillColorRGB(fill[0], fill[1], fill[2])
+        do_fill = 1
+    if stroke:
+        c.setStrokeColorRGB(stroke[0], stroke[1], stroke[2])
+        c.setLineWidth(lw * mm)
+        do_stroke = 1
+
+    c.drawPath(PDFPathObject(code=[code] if code else None),
+               fill=do_fill, stroke=do_stroke)
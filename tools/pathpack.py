@@ -0,0 +1,133 @@
+"""
+Compact binary encoding for pdfpath geometry.
+
+Imported PDF artwork is stored as {"ops": [{"o": "M", "a": [x, y]}, ...],
+"fill": ..., "stroke": ..., "lw": ...}. As JSON that is verbose and slow
+to parse, so components.path_data holds a packed blob instead:
+
+  b"PTH1" | uint32 header length | header JSON | zlib(body)
+
+The header carries the style keys (everything except "ops") and the op
+and point counts. The body is one opcode byte per op followed by the x
+and then the y coordinates, each quantized to 1/STEPS_PER_MM mm and delta
+encoded against the previous point as little-endian int32.
+
+Paths that do not fit the format (unknown ops, wrong argument counts,
+coordinates too large for int32 deltas) are left as JSON text; load_path_data() accepts both forms.
+"""
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+MAGIC = b"PTH1"
+
+# Coordinate resolution: quantization steps per mm (1 micron)
+STEPS_PER_MM = 1000
+
+_OPCODES = {"M": 0, "L": 1, "C": 2, "Z": 3}
+_OPNAMES = "MLCZ"
+_ARITY = (2, 2, 6, 0)
+
+
+def pack_path(path_data):
+    """
+    Pack a pathData dict into a binary blob.
+
+    Returns None if the path does not fit the format; callers then store
+    it as JSON.
+    """
+    ops = path_data.get("ops")
+    if not isinstance(ops, list):
+        return None
+
+    opcodes = bytearray()
+    coords = []
+    try:
+        for op in ops:
+            code = _OPCODES[op["o"]]
+            a = op.get("a") or []
+            if len(a) != _ARITY[code]:
+                return None
+            opcodes.append(code)
+            coords.extend(a)
+        q = [round(v * STEPS_PER_MM) for v in coords]
+        xs = q[0::2]
+        ys = q[1::2]
+        # Raises OverflowError for deltas that do not fit int32
+        deltas = array("i", [b - a for a, b in zip([0] + xs, xs)])
+        deltas.extend([b - a for a, b in zip([0] + ys, ys)])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+
+    if sys.byteorder != "little":
+        deltas.byteswap()
+
+    style = {k: v for k, v in path_data.items() if k != "ops"}
+    header = json.dumps({"style": style, "ops": len(opcodes), "points": len(xs)},
+                        separators=(",", ":")).encode("utf-8")
+    body = zlib.compress(bytes(opcodes) + deltas.tobytes())
+    return MAGIC + struct.pack("<I", len(header)) + header + body
+
+
+def decode_path(blob):
+    """
+    Decode a packed blob into (style, opcodes, coords).
+
+    opcodes is a bytes object of op indexes into "MLCZ"; coords is a flat
+    list of floats in mm, x and y interleaved, in op order.
+    """
+    if blob[:4] != MAGIC:
+        raise ValueError("Not a packed path")
+    (header_len,) = struct.unpack_from("<I", blob, 4)
+    header = json.loads(blob[8:8 + header_len].decode("utf-8"))
+    body = zlib.decompress(blob[8 + header_len:])
+
+    n_ops = header["ops"]
+    n_points = header["points"]
+    opcodes = body[:n_ops]
+    deltas = array("i")
+    deltas.frombytes(body[n_ops:])
+    if sys.byteorder != "little":
+        deltas.byteswap()
+
+    coords = [0.0] * (2 * n_points)
+    coords[0::2] = [v / STEPS_PER_MM for v in accumulate(deltas[:n_points])]
+    coords[1::2] = [v / STEPS_PER_MM for v in accumulate(deltas[n_points:])]
+    return header["style"], opcodes, coords
+
+
+def unpack_path(blob):
+    """Decode a packed blob back into a pathData dict."""
+    style, opcodes, coords = decode_path(blob)
+    ops = []
+    i = 0
+    for code in opcodes:
+        n = _ARITY[code]
+        ops.append({"o": _OPNAMES[code], "a": coords[i:i + n]})
+        i += n
+    path_data = {"ops": ops}
+    path_data.update(style)
+    return path_data
+
+
+def dump_path_data(path_data):
+    """Return the database representation of a pathData dict (blob or JSON)."""
+    if not path_data:
+        return None
+    packed = pack_path(path_data)
+    if packed is not None:
+        return packed
+    return json.dumps(path_data)
+
+
+def load_path_data(value):
+    """Return a pathData dict from a stored blob or JSON string (or None)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (bytes, memoryview)):
+        return unpack_path(bytes(value))
+    return json.loads(value)
@@ -0,0 +1,88 @@
+"""
+Render plans for saved templates.
+
+A render plan is a template's export payload compiled ahead of time:
+the display list of the whole label (tools/display_list.py), the static
+layer that batch exports draw once, and the variable components they
+fill per row. The server builds a template's plan when its components
+or settings are saved and tags it with the template's revision counter,
+so an export of a saved template only checks the revision and renders.
+
+Plans are held in a bounded in-memory LRU keyed by template id. A plan
+for an older revision is never returned; the caller rebuilds it.
+"""
+
+import threading
+from collections import OrderedDict
+
+from tools.display_list import compile_items, compile_page
+from tools.export_cache import export_key
+from tools.variable_data import is_variable
+
+# Maximum number of templates whose plan is kept in memory
+PLAN_CACHE_SIZE = 64
+
+_plans = OrderedDict()  # template id -> plan
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "builds": 0}
+
+
+def build_plan(tid, revision, data):
+    """
+    Compile the export payload of template tid at revision and cache it.
+
+    Returns:
+        dict with 'revision', 'key' (content hash of the payload, for
+        export cache keys), 'display' (the whole label), 'static' (the
+        label without its variable components) and 'variable' (those
+        components, as export payload dicts)
+    """
+    components = data.get("components", [])
+    compiled = [(comp, is_variable(comp), compile_items([comp])) for comp in components]
+    display = compile_page(data, ())
+    plan = {
+        "revision": revision,
+        "key": export_key(data, "plan"),
+        "display": dict(display, items=[i for _, _, items in compiled for i in items]),
+        "static": dict(display, items=[i for _, var, items in compiled if not var for i in items]),
+        "variable": [comp for comp, var, _ in compiled if var],
+    }
+
+    with _lock:
+        _stats["builds"] += 1
+        _plans[tid] = plan
+        _plans.move_to_end(tid)
+        if len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def get_plan(tid, revision):
+    """Return the cached plan of template tid at revision, or None."""
+    with _lock:
+        plan = _plans.get(tid)
+        if plan is None or plan["revision"] != revision:
+            _stats["misses"] += 1
+            return None
+        _plans.move_to_end(tid)
+        _stats["hits"] += 1
+        return plan
+
+
+def drop_plan(tid):
+    with _lock:
+        _plans.pop(tid, None)
+
+
+def cache_stats():
+    """Return hit/miss/build counters and the current size of the plan cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["plans_cached"] = len(_plans)
+    stats["cache_size"] = PLAN_CACHE_SIZE
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _plans.clear()
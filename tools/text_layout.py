@@ -0,0 +1,131 @@
+"""
+Shared text layout for the exporters.
+
+Every format wraps paragraphs here, against the metrics of the reportlab
+standard font the editor family maps to, so PDF, AI and SVG output break
+lines at the same words. Advance widths are kept in a table per font and
+each word is measured once; lines are then filled greedily in one pass
+over the words. Wrapped paragraphs are cached by (text, font, size,
+width), so a paragraph repeated on every label of a run is laid out once.
+"""
+
+import threading
+from collections import OrderedDict
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Maximum number of wrapped paragraphs kept in memory
+LAYOUT_CACHE_SIZE = 4096
+
+# Editor font families -> reportlab standard fonts with matching metrics
+FONT_MAP = {
+    "Arial": "Helvetica",
+    "Helvetica": "Helvetica",
+    "Times New Roman": "Times-Roman",
+    "Courier New": "Courier",
+    "Georgia": "Times-Roman",
+    "Verdana": "Helvetica",
+}
+DEFAULT_FONT = "Helvetica"
+
+_advances = {}  # font -> {char: width at 1pt}
+_advances_lock = threading.Lock()
+
+_lines = OrderedDict()
+_lines_lock = threading.Lock()
+
+_stats = {"hits": 0, "misses": 0}
+
+
+def pdf_font(font_family):
+    """Return the reportlab standard font used for an editor font family."""
+    return FONT_MAP.get(font_family, DEFAULT_FONT)
+
+
+def _advance_table(font):
+    with _advances_lock:
+        table = _advances.get(font)
+        if table is None:
+            table = _advances[font] = {}
+        return table
+
+
+def text_width(text, font, size=1):
+    """Return the width of text in points, from the per-font advance table."""
+    table = _advance_table(font)
+    width = 0.0
+    for char in text:
+        advance = table.get(char)
+        if advance is None:
+            advance = table[char] = stringWidth(char, font, 1)
+        width += advance
+    return width * size
+
+
+def _wrap(text, font, size, max_width):
+    space = text_width(" ", font, size)
+    lines = []
+    current = []
+    current_w = 0.0
+    for word in text.split():
+        word_w = text_width(word, font, size)
+        if current and current_w + space + word_w <= max_width:
+            current.append(word)
+            current_w += space + word_w
+        else:
+            if current:
+                lines.append(" ".join(current))
+            current = [word]
+            current_w = word_w
+    if current:
+        lines.append(" ".join(current))
+    return tuple(lines)
+
+
+def wrap_text(text, font, size, max_width):
+    """
+    Word-wrap text into lines no wider than max_width.
+
+    A word wider than max_width gets a line of its own.
+
+    Args:
+        text: paragraph text; runs of whitespace collapse to one space
+        font: reportlab standard font name (see pdf_font())
+        size: font size in points
+        max_width: available width in points
+
+    Returns:
+        tuple of line strings
+    """
+    key = (text, font, size, max_width)
+    with _lines_lock:
+        lines = _lines.get(key)
+        if lines is not None:
+            _lines.move_to_end(key)
+            _stats["hits"] += 1
+            return lines
+        _stats["misses"] += 1
+
+    lines = _wrap(text, font, size, max_width)
+
+    with _lines_lock:
+        _lines[key] = lines
+        if len(_lines) > LAYOUT_CACHE_SIZE:
+            _lines.popitem(last=False)
+    return lines
+
+
+def cache_stats():
+    """Return hit/miss counters and the current size of the layout cache."""
+    with _lines_lock:
+        stats = dict(_stats)
+        stats["paragraphs_cached"] = len(_lines)
+    stats["cache_size"] = LAYOUT_CACHE_SIZE
+    return stats
+
+
+def clear_cache():
+    with _lines_lock:
+        _lines.clear()
+    with _advances_lock:
+        _advances.clear()
@@ -0,0 +1,92 @@
+"""
+Variable-data helpers for batch label export.
+
+Rows of field values are read from CSV or NDJSON and merged into a
+label's components. A component takes its value either from a 'field'
+key naming a column, or from '{{column}}' placeholders in its content.
+"""
+
+import csv
+import json
+import re
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+ROW_FORMATS = ("csv", "ndjson")
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield one dict of field values per record, reading lazily.
+
+    Args:
+        stream: text stream (file object or iterable of lines)
+        fmt: "csv" (header row required) or "ndjson" (one object per line)
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for n, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {n}: invalid JSON ({e})")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {n}: expected a JSON object")
+            yield row
+    else:
+        raise ValueError(f"Unknown row format: {fmt}")
+
+
+def is_variable(comp):
+    """Return True if a component's content depends on row values."""
+    if comp.get("field"):
+        return True
+    return bool(_PLACEHOLDER.search(comp.get("content") or ""))
+
+
+def fill_component(comp, row, row_num=None):
+    """
+    Return a copy of a variable component with its content filled from row.
+
+    Raises ValueError if the row has no column for a referenced field.
+    """
+    def value(name):
+        if name not in row:
+            where = f"Row {row_num}: " if row_num is not None else ""
+            raise ValueError(f"{where}no value for field '{name}'")
+        v = row[name]
+        return "" if v is None else str(v)
+
+    out = dict(comp)
+    if comp.get("field"):
+        out["content"] = value(comp["field"])
+    else:
+        out["content"] = _PLACEHOLDER.sub(lambda m: value(m.group(1)),
+                                          comp.get("content") or "")
+    return out
+
+
+def split_components(components):
+    """Split components into (static, variable) lists, keeping draw order."""
+    static = []
+    variable = []
+    for comp in components:
+        (variable if is_variable(comp) else static).append(comp)
+    return static, variable
+
+
+def iter_pages(components, rows):
+    """
+    Yield the component list for each row.
+
+    Static components are shared between pages; only variable ones are
+    copied and filled.
+    """
+    variable = [is_variable(comp) for comp in components]
+    for n, row in enumerate(rows, 1):
+        yield [fill_component(comp, row, n) if var else comp
+               for comp, var in zip(components, variable)]